@@ -2,15 +2,15 @@
 class TestObserver:
     def __init__(self, test_manager):
         self.test_manager = test_manager
-        self.test_manager.register_observer(self)
+        self.test_manager.register_observer(self, events=("test_failed",))
 
-    def notify(self, event):
-        if event == "test_failed":
-            self.log_failure()
+    def notify(self, event, test_data):
+        # Only subscribed to test_failed, so no need to check the event
+        self.log_failure(test_data)
 
-    def log_failure(self):
+    def log_failure(self, test_data):
         # Logic for logging test failure
-        print("Test failed. Logging details...")
+        print(f"Test failed. Logging details... {test_data}")
 
 class TestManager:
     def __init__(self):
@@ -30,47 +30,629 @@ class TestManager:
 
 
 
+#Asynchronous dispatch: with async_dispatch=True, notify_observers only puts the event on a bounded EventQueue
+#and returns, so a slow observer never adds its latency to the test. Background dispatch workers drain the queue
+#and call the observers. When the queue is full the backpressure policy decides what happens:
+#"block" waits for free space, "drop-oldest" discards the oldest waiting event,
+#"coalesce" replaces the latest waiting event of the same type with the newer one (only the latest state is delivered),
+#and blocks like "block" when no event of that type is waiting. Below maxsize every event is queued under every policy.
+#Call flush() at the end of the suite to wait until every queued event has been delivered, and close() when the manager
+#is no longer needed: it flushes, then stops and joins the dispatch workers (and closes the journal, see below).
+#Use a single dispatch worker if observers must see events in order.
+#Observers subscribe to the event types they care about: register_observer(observer, events=("test_completed",)).
+#TestObserver above uses this: it subscribes to "test_failed" only and receives the test_data of the failed test.
+#Dispatch only looks at the subscriptions for that event (plus ALL_EVENTS), instead of broadcasting to every observer.
+#The registry holds weak references, so an observer that is no longer used anywhere else is removed automatically
+#and never called again.
+#Windowed dashboard: DashboardObserver(test_manager, interval=5.0, max_events=1000) keeps RollingAggregates in memory
+#(passed/failed counts, duration percentiles, throughput) and publishes at most one dashboard update per interval seconds
+#or per max_events events, whichever comes first. TestManager.flush() publishes whatever is left at the end of the suite.
+#Without interval and max_events the observer updates the dashboard on every event as before.
+#In windowed mode test_data is expected to be a dict such as {"name": "Login", "passed": True, "duration": 0.42}.
+#Event journal: TestManager(journal_file="run.journal") appends every event to an EventJournal before dispatching it,
+#one JSON line per event. Each line is flushed to the operating system straight away, so it survives the process being killed
+#(for example by the OOM killer), and os.fsync runs every fsync_every events or fsync_interval seconds to survive a machine crash.
+#After a crash, create the manager with the same journal and resume=True: the journal is read back (a half-written last line is
+#ignored), every event is replayed to the observers so the dashboard ends up consistent, and execute_test skips the tests that
+#have a test_completed or test_failed event in the journal. Tests are identified by test_data["name"], or by test_data itself;
+#a test without a name is never skipped. Without resume=True nothing is skipped and nothing is remembered.
+import json
+import os
+import statistics
+import tempfile
+import threading
+import time
+import weakref
+from collections import OrderedDict, defaultdict
+from itertools import count
+
+ALL_EVENTS = "*"
+TERMINAL_EVENTS = ("test_completed", "test_failed")
+
+class EventQueue:
+    def __init__(self, maxsize=1000, policy="block"):
+        self.maxsize = maxsize
+        self.policy = policy
+        self.events = OrderedDict()
+        self.latest = {}  # event type -> key of its most recent queued event, used by "coalesce"
+        self.sequence = count()
+        self.unfinished = 0
+        self.dropped = 0
+        self.condition = threading.Condition()
+
+    def put(self, event, test_data):
+        with self.condition:
+            if len(self.events) >= self.maxsize:
+                if self.policy == "coalesce" and self.latest.get(event) in self.events:
+                    self.events[self.latest[event]] = (event, test_data)
+                    self.dropped += 1
+                    return
+                if self.policy == "drop-oldest":
+                    self.forget(*self.events.popitem(last=False))
+                    self.unfinished -= 1
+                    self.dropped += 1
+                else:
+                    self.condition.wait_for(lambda: len(self.events) < self.maxsize)
+            key = next(self.sequence)
+            self.events[key] = (event, test_data)
+            self.latest[event] = key
+            self.unfinished += 1
+            self.condition.notify_all()
+
+    def put_stop(self):
+        # A sentinel for one dispatch worker, queued past maxsize and every policy so it is never dropped or replaced
+        with self.condition:
+            self.events[next(self.sequence)] = None
+            self.condition.notify_all()
+
+    def forget(self, key, item):
+        if item is not None and self.latest.get(item[0]) == key:
+            del self.latest[item[0]]
+
+    def get(self):
+        with self.condition:
+            self.condition.wait_for(lambda: self.events)
+            key, item = self.events.popitem(last=False)
+            self.forget(key, item)
+            self.condition.notify_all()
+            return item
+
+    def task_done(self):
+        with self.condition:
+            self.unfinished -= 1
+            self.condition.notify_all()
+
+    def join(self):
+        with self.condition:
+            self.condition.wait_for(lambda: self.unfinished == 0)
+
+class RollingAggregates:
+    def __init__(self):
+        self.passed = 0
+        self.failed = 0
+        self.window_events = 0
+        self.window_durations = []
+        self.window_start = time.monotonic()
+
+    def add(self, test_data):
+        data = test_data if isinstance(test_data, dict) else {}
+        if data.get("passed", True):
+            self.passed += 1
+        else:
+            self.failed += 1
+        if data.get("duration") is not None:
+            self.window_durations.append(data["duration"])
+        self.window_events += 1
+
+    def summary(self):
+        # Counts are for the whole run, percentiles and throughput for the window since the last update
+        elapsed = time.monotonic() - self.window_start
+        summary = {"passed": self.passed, "failed": self.failed, "events": self.window_events,
+                   "throughput_per_s": round(self.window_events / elapsed, 1) if elapsed else None}
+        if len(self.window_durations) > 1:
+            percentiles = statistics.quantiles(self.window_durations, n=100, method="inclusive")
+            summary.update(p50=round(percentiles[49], 4), p95=round(percentiles[94], 4))
+        elif self.window_durations:
+            summary.update(p50=self.window_durations[0], p95=self.window_durations[0])
+        return summary
+
+    def reset_window(self):
+        self.window_events = 0
+        self.window_durations = []
+        self.window_start = time.monotonic()
+
 class DashboardObserver:
-    def __init__(self, test_manager):
+    def __init__(self, test_manager, interval=None, max_events=None):
         self.test_manager = test_manager
-        self.test_manager.register_observer(self)
+        self.interval = interval
+        self.max_events = max_events
+        self.aggregates = RollingAggregates()
+        self.lock = threading.Lock()
+        self.test_manager.register_observer(self, events=("test_completed",))
 
     def notify(self, event, test_data):
-        if event == "test_completed":
+        if event != "test_completed":
+            return
+        if self.interval is None and self.max_events is None:
             self.update_dashboard(test_data)
+            return
+        with self.lock:
+            self.aggregates.add(test_data)
+            window_elapsed = time.monotonic() - self.aggregates.window_start
+            if ((self.interval is not None and window_elapsed >= self.interval)
+                    or (self.max_events is not None and self.aggregates.window_events >= self.max_events)):
+                self.publish()
+
+    def publish(self):
+        if self.aggregates.window_events:
+            self.update_dashboard(self.aggregates.summary())
+            self.aggregates.reset_window()
+
+    def flush(self):
+        with self.lock:
+            self.publish()
 
     def update_dashboard(self, test_data):
         # Logic to update a dashboard with test data
         print(f"Updating dashboard with: {test_data}")
 
+class EventJournal:
+    def __init__(self, path, fsync_every=100, fsync_interval=1.0):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.file = open(path, "a", encoding="utf-8")
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+        self.lock = threading.Lock()
+
+    def append(self, event, test_data):
+        line = json.dumps({"event": event, "test_data": test_data}, default=str) + "\n"
+        with self.lock:
+            self.file.write(line)
+            self.file.flush()
+            self.unsynced += 1
+            if self.unsynced >= self.fsync_every or time.monotonic() - self.last_sync >= self.fsync_interval:
+                self.sync()
+
+    def sync(self):
+        os.fsync(self.file.fileno())
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+
+    def close(self):
+        with self.lock:
+            self.sync()
+            self.file.close()
+
+    @staticmethod
+    def read(path):
+        with open(path, encoding="utf-8") as journal_file:
+            for line in journal_file:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # the last line of a crashed run may be cut short
+                yield record["event"], record["test_data"]
+
+def test_key(test_data):
+    return test_data.get("name") if isinstance(test_data, dict) else test_data
+
 class TestManager:
-    def __init__(self):
-        self.observers = []
+    def __init__(self, async_dispatch=False, queue_size=1000, dispatch_workers=1, backpressure="block",
+                 journal_file=None, resume=False):
+        self.subscriptions = defaultdict(list)
+        self.event_queue = None
+        self.journal = None
+        self.journal_file = journal_file
+        self.resume = resume
+        self.completed = set()  # tests finished before the crash, filled by replay_journal
+        self.dispatch_threads = []
+        if async_dispatch:
+            self.event_queue = EventQueue(queue_size, backpressure)
+            for _ in range(dispatch_workers):
+                thread = threading.Thread(target=self.dispatch_events, daemon=True)
+                thread.start()
+                self.dispatch_threads.append(thread)
+        if journal_file:
+            self.journal = EventJournal(journal_file)
     
-    def register_observer(self, observer):
-        self.observers.append(observer)
+    def register_observer(self, observer, events=(ALL_EVENTS,)):
+        reference = weakref.ref(observer, self.unregister_reference)
+        for event in events:
+            self.subscriptions[event].append(reference)
+
+    def unregister_reference(self, reference):
+        # Called by weakref when an observer is garbage collected
+        for references in self.subscriptions.values():
+            if reference in references:
+                references.remove(reference)
+
+    @property
+    def observers(self):
+        references = {id(reference): reference for references in self.subscriptions.values() for reference in references}
+        return [observer for observer in (reference() for reference in references.values()) if observer is not None]
     
     def notify_observers(self, event, test_data):
+        if self.journal:
+            self.journal.append(event, test_data)
+        self.dispatch(event, test_data)
+
+    def dispatch(self, event, test_data):
+        if self.event_queue:
+            self.event_queue.put(event, test_data)
+        else:
+            self.deliver(event, test_data)
+
+    def replay_journal(self):
+        # Sends the events of the interrupted run to the observers registered so far, without journaling them again
+        replayed = 0
+        for event, test_data in EventJournal.read(self.journal_file):
+            if event in TERMINAL_EVENTS and test_key(test_data) is not None:
+                self.completed.add(test_key(test_data))
+            self.dispatch(event, test_data)
+            replayed += 1
+        self.resume = False
+        return replayed
+
+    def deliver(self, event, test_data):
+        for reference in self.subscriptions.get(event, []) + self.subscriptions.get(ALL_EVENTS, []):
+            observer = reference()
+            if observer is not None:
+                observer.notify(event, test_data)
+
+    def dispatch_events(self):
+        while True:
+            item = self.event_queue.get()
+            if item is None:
+                break  # close() stops the worker
+            event, test_data = item
+            try:
+                self.deliver(event, test_data)
+            except Exception as e:
+                print(f"Observer failed on {event}: {e}")
+            finally:
+                self.event_queue.task_done()
+
+    def flush(self):
+        # Waits until every queued event has reached the observers, then lets windowed observers publish
+        if self.event_queue:
+            self.event_queue.join()
         for observer in self.observers:
-            observer.notify(event, test_data)
+            if hasattr(observer, "flush"):
+                observer.flush()
+
+    def close(self):
+        self.flush()
+        for _ in self.dispatch_threads:
+            self.event_queue.put_stop()
+        for thread in self.dispatch_threads:
+            thread.join()
+        self.dispatch_threads = []
+        if self.journal:
+            self.journal.close()
 
     def execute_test(self, test_data):
+        if self.resume:
+            self.replay_journal()
+        key = test_key(test_data)
+        if key is not None and key in self.completed:
+            return  # already completed before the crash
         # Test execution logic
         self.notify_observers("test_completed", test_data)
 
+
+if __name__ == "__main__":
+    test_manager = TestManager(async_dispatch=True, queue_size=100, backpressure="drop-oldest")
+    dashboard = DashboardObserver(test_manager)
+    for test_number in range(5):
+        test_manager.execute_test(f"Test {test_number} passed")  # returns without waiting for the dashboard
+    test_manager.close()
+
+    windowed_manager = TestManager()
+    windowed_dashboard = DashboardObserver(windowed_manager, interval=5.0, max_events=1000)
+    for test_number in range(2500):
+        windowed_manager.execute_test({"name": f"Test {test_number}", "passed": test_number % 50 != 0,
+                                       "duration": 0.01 * (test_number % 7)})
+    windowed_manager.flush()  # three dashboard updates instead of 2500
+
+    journal_path = os.path.join(tempfile.mkdtemp(), "run.journal")
+    crashed_manager = TestManager(journal_file=journal_path)
+    for test_number in range(3):
+        crashed_manager.execute_test({"name": f"Test {test_number}", "passed": True})
+    # ... the runner is killed here, then the run is started again from the journal
+    resumed_manager = TestManager(journal_file=journal_path, resume=True)
+    resumed_dashboard = DashboardObserver(resumed_manager)
+    for test_number in range(5):
+        resumed_manager.execute_test({"name": f"Test {test_number}", "passed": True})  # Tests 0-2 are replayed, not rerun
+    resumed_manager.close()
+
+#Execution strategies: a test suite is a TestSuite with a name and a list of module-level test functions.
+#Every strategy returns one result dict per test: name, passed, error_message, duration (and agent for remote runs).
+#LocalExecutionStrategy runs the suite on a pool of worker processes on this machine.
+#RemoteExecutionStrategy is a coordinator: it listens on a TCP socket and agent processes connect to it and pull tests.
+#The protocol is one JSON object per line. An agent sends {"type": "pull", "agent": name, "result": previous result or null}
+#and receives either {"type": "task", "id", "module", "name"} or {"type": "done"}. The agent imports the module,
+#looks up the test function by name and runs it, so test functions must be importable on the agent.
+#Work stealing: the coordinator keeps one deque of tests per agent and first refills it with a batch from the shared queue.
+#An agent takes work from the front of its own deque; when its deque and the shared queue are empty it steals half of the tests
+#still waiting at the back of the busiest agent's deque, so a slow agent does not hold the end of the run.
+#If an agent disconnects while running a test, the test goes back to the shared queue. A test that no agent is left to run
+#is returned as a failed result ("Not run: no agent left to run the test"), so the result list always covers the whole suite.
+#Agents on other machines run run_agent(host, port, name); with spawn_agents=N the strategy starts N agents on localhost.
+#AdaptiveExecutionStrategy is the auto mode: it picks, for each suite, the candidate strategy (or a split across two of them)
+#with the lowest expected wall time. The expected time of a strategy is startup + tests * per_test + test time / parallelism,
+#where startup and per_test are measured once by running a small calibration suite through it, and the test time comes from the
+#duration history of previous runs (tests never seen before get the median known duration). It prints the reason for its choice,
+#so small suites stay local instead of paying the remote startup cost, and large suites move to where there is more parallelism.
+#A strategy without a parallelism attribute counts as running one test at a time, and a strategy whose calibration run returns
+#no results (such as the CloudExecutionStrategy placeholder) is skipped with a message instead of being chosen.
+#Warm worker pool: TestExecutor(strategy, worker_pool=WarmWorkerPool(preload=("requests", "yaml", ...))) owns a pool of worker
+#processes that is created once, after the common heavy modules have been imported, and forked from that state where the platform
+#supports fork. The pool lives as long as the TestExecutor: set_strategy hands it to the new strategy, and LocalExecutionStrategy
+#uses it instead of starting a new ProcessPoolExecutor for every suite. Before each test the worker is health-checked; a worker
+#that died, has run max_tests_per_worker tests or has grown past max_memory_mb (peak RSS) is replaced by a fresh one.
+#Rule for test functions that cannot be pickled: a worker receives each test function by pickling it, which only works for
+#functions defined at module level. A lambda, closure or nested function cannot be sent; the pool reports it as a failed
+#result ("Test cannot be sent to a worker") and carries on with the other tests.
+#Call TestExecutor.close() to stop the workers. measure_warm_pool_saving compares the per-suite latency of a cold and a warm pool.
+#The usage examples in this file are guarded by if __name__ == "__main__", so worker processes started with the "spawn" method
+#(the default on Windows and macOS), which import this file again, do not run them.
+import importlib
+import json
+import multiprocessing
+import os
+import socket
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.connection import wait
+
+try:
+    import resource
+except ImportError:  # not available on Windows, memory based recycling is then disabled
+    resource = None
+
+# ru_maxrss is in kilobytes on Linux but in bytes on macOS
+MAXRSS_PER_MB = 1024 * 1024 if sys.platform == "darwin" else 1024
+
+class TestSuite:
+    def __init__(self, name, tests):
+        self.name = name
+        self.tests = tests
+
+def run_test(test_function):
+    start_time = time.perf_counter()
+    try:
+        test_function()
+        passed, error_message = True, None
+    except Exception as e:
+        passed, error_message = False, str(e)
+    return {"name": test_function.__name__, "passed": passed, "error_message": error_message,
+            "duration": time.perf_counter() - start_time}
+
+def send_message(stream, message):
+    stream.write(json.dumps(message) + "\n")
+    stream.flush()
+
+def run_agent(host, port, name):
+    with socket.create_connection((host, port)) as connection:
+        stream = connection.makefile("rw", encoding="utf-8")
+        send_message(stream, {"type": "pull", "agent": name, "result": None})
+        for line in stream:
+            message = json.loads(line)
+            if message["type"] == "done":
+                break
+            test_function = getattr(importlib.import_module(message["module"]), message["name"])
+            result = run_test(test_function)
+            result.update(id=message["id"], agent=name)
+            send_message(stream, {"type": "pull", "agent": name, "result": result})
+
+def warm_worker_main(connection):
+    while True:
+        test_function = connection.recv()
+        if test_function is None:
+            break
+        result = run_test(test_function)
+        peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / MAXRSS_PER_MB if resource else 0.0
+        connection.send((result, peak_rss_mb))
+
+class WarmWorkerPool:
+    def __init__(self, workers=None, preload=(), max_tests_per_worker=500, max_memory_mb=None):
+        for module in preload:
+            importlib.import_module(module)  # imported once here, inherited by every forked worker
+        methods = multiprocessing.get_all_start_methods()
+        self.context = multiprocessing.get_context("fork" if "fork" in methods else None)
+        self.max_tests_per_worker = max_tests_per_worker
+        self.max_memory_mb = max_memory_mb
+        self.lock = threading.Lock()
+        self.recycled = 0
+        self.workers = [self.start_worker() for _ in range(workers or os.cpu_count() or 1)]
+
+    def start_worker(self):
+        connection, child_connection = self.context.Pipe()
+        process = self.context.Process(target=warm_worker_main, args=(child_connection,), daemon=True)
+        process.start()
+        child_connection.close()
+        return {"process": process, "connection": connection, "tests": 0, "rss_mb": 0.0}
+
+    def is_healthy(self, worker):
+        return (worker["process"].is_alive()
+                and worker["tests"] < self.max_tests_per_worker
+                and (self.max_memory_mb is None or worker["rss_mb"] < self.max_memory_mb))
+
+    def recycle(self, worker):
+        self.stop_worker(worker)
+        self.recycled += 1
+        worker.update(self.start_worker())
+
+    def stop_worker(self, worker):
+        if worker["process"].is_alive():
+            try:
+                worker["connection"].send(None)
+            except OSError:
+                pass
+            worker["process"].join(timeout=1)
+        if worker["process"].is_alive():
+            worker["process"].terminate()
+        worker["connection"].close()
+
+    def run(self, tests):
+        with self.lock:
+            pending = deque(enumerate(tests))
+            results = {}
+            busy = {}
+
+            def failed(test_function, error_message):
+                return {"name": getattr(test_function, "__name__", repr(test_function)), "passed": False,
+                        "error_message": error_message, "duration": 0.0}
+
+            def dispatch(worker):
+                # Sends the next test that can be sent; a test that cannot is recorded as failed and never blocks the worker
+                while pending:
+                    index, test_function = pending.popleft()
+                    for attempt in range(2):
+                        if not self.is_healthy(worker):
+                            self.recycle(worker)
+                        try:
+                            worker["connection"].send(test_function)
+                        except OSError:
+                            # The worker died after the health check, retry once on a fresh one
+                            worker["process"].terminate()
+                            continue
+                        except Exception as e:
+                            results[index] = failed(test_function, f"Test cannot be sent to a worker: {e}")
+                            break
+                        busy[id(worker["connection"])] = (worker, index, test_function)
+                        return
+                    else:
+                        results[index] = failed(test_function, "Worker process died")
+
+            try:
+                for worker in self.workers:
+                    dispatch(worker)
+                while busy:
+                    for connection in wait([worker["connection"] for worker, _, _ in busy.values()]):
+                        worker, index, test_function = busy.pop(id(connection))
+                        try:
+                            results[index], worker["rss_mb"] = connection.recv()
+                        except EOFError:
+                            results[index] = failed(test_function, "Worker process died")
+                        worker["tests"] += 1
+                        dispatch(worker)
+            finally:
+                # A worker left busy by an error still has a result in its pipe, the next run must not read it
+                for worker, _, _ in busy.values():
+                    self.recycle(worker)
+            return [results[index] for index in range(len(tests))]
+
+    def close(self):
+        for worker in self.workers:
+            self.stop_worker(worker)
+
 class ExecutionStrategy:
+    worker_pool = None
+    parallelism = 1
+
     def execute(self, test_suite):
         pass
 
 class LocalExecutionStrategy(ExecutionStrategy):
+    def __init__(self, workers=None):
+        self.workers = workers
+
+    @property
+    def parallelism(self):
+        if self.worker_pool:
+            return len(self.worker_pool.workers)
+        return self.workers or os.cpu_count() or 1
+
     def execute(self, test_suite):
         print("Running tests locally...")
-        # Logic for executing tests on the local machine
+        if self.worker_pool:
+            return self.worker_pool.run(test_suite.tests)
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            return list(pool.map(run_test, test_suite.tests))
 
 class RemoteExecutionStrategy(ExecutionStrategy):
+    def __init__(self, host="127.0.0.1", port=0, spawn_agents=2, batch_size=4):
+        self.host = host
+        self.port = port
+        self.spawn_agents = spawn_agents
+        self.batch_size = batch_size
+        self.parallelism = max(spawn_agents, 1)
+
     def execute(self, test_suite):
         print("Running tests remotely...")
-        # Logic for connecting to and executing tests on remote infrastructure
+        self.shared = deque(enumerate(test_suite.tests))
+        self.agent_queues = {}
+        self.results = {}
+        self.total = len(test_suite.tests)
+        self.lock = threading.Lock()
+        self.finished = threading.Event()
+        if not self.total:
+            return []
+        with socket.create_server((self.host, self.port)) as server:
+            host, port = server.getsockname()[:2]
+            agents = [multiprocessing.Process(target=run_agent, args=(host, port, f"agent-{number}"), daemon=True)
+                      for number in range(self.spawn_agents)]
+            for agent in agents:
+                agent.start()
+            server.settimeout(0.05)
+            while True:
+                # Local agents inherit the listening socket, so keep answering them until they have all exited
+                if not any(agent.is_alive() for agent in agents) and (agents or self.finished.is_set()):
+                    break
+                try:
+                    connection, address = server.accept()
+                except socket.timeout:
+                    continue
+                threading.Thread(target=self.serve_agent, args=(connection,), daemon=True).start()
+        for agent in agents:
+            agent.join()
+        # A test handed back by a dead agent when no agent was left to take it is reported, never dropped
+        return [self.results.get(test_id) or {"name": test_function.__name__, "passed": False,
+                                              "error_message": "Not run: no agent left to run the test",
+                                              "duration": 0.0}
+                for test_id, test_function in enumerate(test_suite.tests)]
+
+    def serve_agent(self, connection):
+        running = None
+        with connection:
+            stream = connection.makefile("rw", encoding="utf-8")
+            try:
+                for line in stream:
+                    message = json.loads(line)
+                    with self.lock:
+                        if message["result"] is not None:
+                            self.results[message["result"]["id"]] = message["result"]
+                            if len(self.results) == self.total:
+                                self.finished.set()
+                        running = self.next_test(message["agent"])
+                    if running is None:
+                        send_message(stream, {"type": "done"})
+                        return
+                    test_id, test_function = running
+                    send_message(stream, {"type": "task", "id": test_id,
+                                          "module": test_function.__module__, "name": test_function.__name__})
+            except (OSError, ValueError):
+                pass
+            finally:
+                if running is not None:
+                    with self.lock:
+                        self.shared.appendleft(running)  # the agent died with the test, give it to another agent
+
+    def next_test(self, agent):
+        # Called with the lock held: own deque first, then a batch from the shared queue, then steal
+        own = self.agent_queues.setdefault(agent, deque())
+        if not own and self.shared:
+            for _ in range(min(self.batch_size, len(self.shared))):
+                own.append(self.shared.popleft())
+        if not own:
+            victim = max(self.agent_queues.values(), key=len)
+            for _ in range(len(victim) // 2 or len(victim)):
+                own.appendleft(victim.pop())
+        return own.popleft() if own else None
 
 
 class CloudExecutionStrategy(ExecutionStrategy):
@@ -79,79 +661,559 @@ class CloudExecutionStrategy(ExecutionStrategy):
         # Logic for running tests on a cloud-based platform
 
 
+def calibration_test():
+    pass
+
+class AdaptiveExecutionStrategy(ExecutionStrategy):
+    def __init__(self, strategies, history_file=None, default_cost=0.05, calibration_size=32):
+        self.strategies = strategies
+        self.history_file = history_file
+        self.default_cost = default_cost
+        self.calibration_size = calibration_size
+        self.overheads = {}
+        self.history = {}
+        self.median = None  # estimate for unseen tests, computed once per history change
+        if history_file and os.path.exists(history_file):
+            with open(history_file) as file:
+                self.history = json.load(file)
+
+    def calibrate(self, strategy):
+        # Two runs of an empty test give the fixed startup cost and the cost of dispatching one more test
+        if strategy not in self.overheads:
+            start_time = time.perf_counter()
+            if strategy.execute(TestSuite("calibration", [calibration_test])) is None:
+                self.overheads[strategy] = None  # returns no results, it cannot run a suite for us
+                return None
+            single = time.perf_counter() - start_time
+            start_time = time.perf_counter()
+            strategy.execute(TestSuite("calibration", [calibration_test] * self.calibration_size))
+            many = time.perf_counter() - start_time
+            per_test = max((many - single) / (self.calibration_size - 1), 0.0)
+            self.overheads[strategy] = (max(single - per_test, 0.0), per_test)
+        return self.overheads[strategy]
+
+    def estimate(self, test_function):
+        if test_function.__name__ in self.history:
+            return self.history[test_function.__name__]
+        if not self.history:
+            return self.default_cost
+        if self.median is None:
+            self.median = statistics.median(self.history.values())
+        return self.median
+
+    def predict(self, strategy, count, total_cost, max_cost):
+        startup, per_test = self.calibrate(strategy)
+        return startup + count * per_test + max(total_cost / strategy.parallelism, max_cost)
+
+    def plan_split(self, first, second, tests):
+        # Longest test first, each to the strategy whose predicted finish stays lowest
+        # Running totals per strategy keep every step O(1), so large suites split in linear time after the sort
+        parts = {first: [], second: []}
+        totals = {first: 0.0, second: 0.0}
+        maxima = {first: 0.0, second: 0.0}
+        estimated = [(self.estimate(test), test) for test in tests]
+        estimated.sort(key=lambda item: item[0], reverse=True)
+        for cost, test in estimated:
+            target = min(parts, key=lambda strategy: self.predict(strategy, len(parts[strategy]) + 1,
+                                                                  totals[strategy] + cost,
+                                                                  max(maxima[strategy], cost)))
+            parts[target].append(test)
+            totals[target] += cost
+            maxima[target] = max(maxima[target], cost)
+        predicted = max(self.predict(strategy, len(parts[strategy]), totals[strategy], maxima[strategy])
+                        for strategy in parts if parts[strategy])
+        return predicted, parts
+
+    def execute(self, test_suite):
+        if not test_suite.tests:
+            return []
+        costs = [self.estimate(test) for test in test_suite.tests]
+        candidates = [strategy for strategy in self.strategies if self.calibrate(strategy) is not None]
+        for strategy in self.strategies:
+            if strategy not in candidates:
+                print(f"Auto strategy: skipping {type(strategy).__name__}, its calibration run returned no results")
+        if not candidates:
+            raise ValueError("None of the strategies returned results for the calibration suite")
+        options = sorted([(self.predict(strategy, len(costs), sum(costs), max(costs)), type(strategy).__name__, strategy)
+                          for strategy in candidates], key=lambda option: option[0])
+        predicted, name, strategy = options[0]
+        plan = {strategy: test_suite.tests}
+        if len(options) > 1:
+            split_predicted, parts = self.plan_split(options[0][2], options[1][2], test_suite.tests)
+            if split_predicted < predicted and all(parts.values()):
+                predicted, plan = split_predicted, parts
+                name = " + ".join(f"{type(part).__name__} ({len(tests)} tests)" for part, tests in parts.items())
+        alternatives = ", ".join(f"{option_name} {option_predicted:.2f}s" for option_predicted, option_name, _ in options)
+        print(f"Auto strategy: {name} for {len(costs)} tests with {sum(costs):.2f}s of estimated test time, "
+              f"predicted {predicted:.2f}s (single strategies: {alternatives})")
+        results = self.run_plan(test_suite.name, plan)
+        for result in results:
+            self.history[result["name"]] = result["duration"]
+        self.median = None
+        if self.history_file:
+            with open(self.history_file, "w") as file:
+                json.dump(self.history, file, indent=2)
+        return results
+
+    def run_plan(self, suite_name, plan):
+        if len(plan) == 1:
+            strategy, tests = next(iter(plan.items()))
+            return strategy.execute(TestSuite(suite_name, tests))
+        results = {}
+        threads = [threading.Thread(target=lambda strategy=strategy, tests=tests:
+                                    results.__setitem__(strategy, strategy.execute(TestSuite(suite_name, tests))))
+                   for strategy, tests in plan.items()]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return [result for strategy in plan for result in results[strategy]]
+
 
 class TestExecutor:
-    def __init__(self, strategy: ExecutionStrategy):
-        self.strategy = strategy
+    def __init__(self, strategy: ExecutionStrategy, worker_pool: WarmWorkerPool = None):
+        self.worker_pool = worker_pool
+        self.set_strategy(strategy)
 
     def set_strategy(self, strategy: ExecutionStrategy):
+        # The warm pool belongs to the executor, so it survives strategy switches
         self.strategy = strategy
+        if self.worker_pool:
+            for candidate in [strategy] + getattr(strategy, "strategies", []):
+                candidate.worker_pool = self.worker_pool
 
     def run_tests(self, test_suite):
-        self.strategy.execute(test_suite)
+        return self.strategy.execute(test_suite)
+
+    def close(self):
+        if self.worker_pool:
+            self.worker_pool.close()
+
+
+def measure_warm_pool_saving(test_suite, runs=5, preload=("json", "sqlite3", "xml.etree.ElementTree")):
+    cold_executor = TestExecutor(LocalExecutionStrategy(workers=4))
+    start_time = time.perf_counter()
+    for _ in range(runs):
+        cold_executor.run_tests(test_suite)
+    cold = (time.perf_counter() - start_time) / runs
+    warm_executor = TestExecutor(LocalExecutionStrategy(), worker_pool=WarmWorkerPool(workers=4, preload=preload))
+    start_time = time.perf_counter()
+    for _ in range(runs):
+        warm_executor.run_tests(test_suite)
+    warm = (time.perf_counter() - start_time) / runs
+    warm_executor.close()
+    print(f"Per-suite latency: cold pool {cold * 1000:.1f}ms, warm pool {warm * 1000:.1f}ms, saved {(cold - warm) * 1000:.1f}ms")
+
+
+def test_login():
+    assert "user1".startswith("user")
+
+def test_search():
+    assert sorted([3, 1, 2]) == [1, 2, 3]
 
+def test_checkout():
+    time.sleep(0.1)
+    assert 2 * 21 == 42
 
+def test_payment_declined():
+    raise ValueError("Payment was declined")
 
-test_executor = TestExecutor(LocalExecutionStrategy())
-test_executor.run_tests("Suite 1")  # Running locally
 
-test_executor.set_strategy(CloudExecutionStrategy())
-test_executor.run_tests("Suite 1")  # Running in the cloud
+if __name__ == "__main__":
+    suite = TestSuite("Suite 1", [test_login, test_search, test_checkout, test_payment_declined] * 4)
+
+    test_executor = TestExecutor(LocalExecutionStrategy())
+    for result in test_executor.run_tests(suite):  # Running locally
+        print(result)
+
+    test_executor.set_strategy(RemoteExecutionStrategy(spawn_agents=3))
+    for result in test_executor.run_tests(suite):  # Running on agents over a socket
+        print(result)
+
+    test_executor.set_strategy(AdaptiveExecutionStrategy([LocalExecutionStrategy(), RemoteExecutionStrategy(spawn_agents=3)]))
+    test_executor.run_tests(TestSuite("Smoke", [test_login, test_search]))  # a small suite stays local
+    test_executor.run_tests(suite)
+
+    test_executor.set_strategy(CloudExecutionStrategy())
+    test_executor.run_tests(suite)  # Running in the cloud
+
+    # One warm pool for the whole session, recycled after 10 tests per worker
+    warm_executor = TestExecutor(LocalExecutionStrategy(), worker_pool=WarmWorkerPool(workers=2, max_tests_per_worker=10))
+    warm_executor.run_tests(suite)
+    warm_executor.set_strategy(AdaptiveExecutionStrategy([LocalExecutionStrategy(), RemoteExecutionStrategy()]))
+    warm_executor.run_tests(suite)  # still the same warm workers when the auto mode picks the local strategy
+    print(f"Workers recycled: {warm_executor.worker_pool.recycled}")
+    warm_executor.close()
+
+    measure_warm_pool_saving(TestSuite("Smoke", [test_login, test_search]))
 
 
 
 #Decorator Pattern
+#Compiled execution plans: every decorator layer adds a Python frame and attribute lookups to each execution.
+#compile_plan walks a decorator stack once and flattens it into an ExecutionPlan, a single ordered list of
+#pre steps (outermost first), the core test and post steps (innermost first). Each decorator lists its steps in plan_steps.
+#ExecutionPlan.execute calls the steps one after another without try/finally, exactly like the nested version:
+#if a step raises, the remaining steps are skipped and the exception propagates unchanged.
+#A decorator subclass that overrides execute without also overriding plan_steps cannot be flattened safely,
+#so compile_plan keeps it as an opaque core step. benchmark_decorator_chain compares nested and flat execution.
+#Shared preconditions: PreconditionDecorator(test_case, scope="suite", cache_key="database") declares a scope
+#("test", "suite" or "session") and a cache key. With the default "test" scope the setup runs before every test as before.
+#With a wider scope the setup runs once and its result is shared by every decorator with the same scope and key
+#through shared_preconditions. A wider scope needs an explicit cache_key, which is how a PreconditionDecorator and
+#the PostconditionDecorator that cleans up after it find the same shared state.
+#A PostconditionDecorator created with the same scope and key registers its teardown instead of running it every time.
+#A test becomes a user of the state when its precondition runs (acquire) and stops being one when its postcondition runs
+#(release); the teardown runs when the last running user has finished. Tests that run one after another would then each
+#set the state up again, so a suite holds its scope open for its whole run:
+#with shared_preconditions.holding("suite"): ... keeps the state alive between tests and tears it down when the block ends.
+#A test that changes the shared state calls shared_preconditions.mark_dirty(scope, key); the next user then tears
+#the old state down and sets it up again. If tests in other threads are still using the old state, the next user waits
+#until they have released it, so a running test never loses its state halfway through.
+#end_scope(scope) tears down whatever is left in a scope, for example after a test failed before its postcondition ran.
+#Buffered logging: LoggingDecorator(test_case, buffered=True) does not print. log_start, log_end and log(event, **fields)
+#append structured records to a ring buffer of the last capacity records kept for that test (collections.deque with maxlen).
+#If the test fails, the failure is added and the whole buffer is handed to a BackgroundLogWriter thread, which writes it as
+#JSON lines; with verbose=True passing tests are written too. A passing test only pays for a few deque appends.
+#The default writer shared by all LoggingDecorators is closed at interpreter exit (atexit), so the records of a test
+#that failed just before the end of the run are written before the process exits; a writer of your own needs close().
+#compile_plan cannot see failures, so a buffered LoggingDecorator is kept as an opaque step in the plan.
+import atexit
+import queue
+import sys
+import timeit
+from collections import Counter
+from contextlib import contextmanager
+
 class TestCase:
-def execute(self):
-print("Executing core test case logic.")
+    def execute(self):
+        print("Executing core test case logic.")
 
 class TestDecorator(TestCase):
-def __init__(self, test_case):
-self.test_case = test_case
+    def __init__(self, test_case):
+        self.test_case = test_case
 
-def execute(self):
-self.test_case.execute()
+    def execute(self):
+        self.test_case.execute()
+
+    def plan_steps(self):
+        # Steps run before and after the wrapped test case, None if the decorator cannot be flattened
+        return [], []
+
+
+class SharedPreconditions:
+    def __init__(self):
+        self.entries = {}
+        self.held = defaultdict(int)
+        self.lock = threading.RLock()
+        self.condition = threading.Condition(self.lock)
+
+    def entry(self, scope, key):
+        # users counts the running users of the state per thread, a thread runs one test at a time
+        return self.entries.setdefault((scope, key), {"state": None, "ready": False, "dirty": False,
+                                                      "users": Counter(), "teardown": None})
+
+    def register_teardown(self, scope, key, teardown):
+        with self.lock:
+            entry = self.entry(scope, key)
+            if entry["teardown"] is None:
+                entry["teardown"] = teardown
+
+    def acquire(self, scope, key, setup):
+        thread = threading.get_ident()
+        with self.lock:
+            entry = self.entry(scope, key)
+            if entry["ready"] and entry["dirty"]:
+                # Tests of other threads still run on the old state, rebuild it only once they have released it.
+                # A use left by this thread belongs to a test that ended without its postcondition, it is not waited for.
+                self.condition.wait_for(lambda: not (entry["ready"] and entry["dirty"])
+                                        or not any(count for user, count in entry["users"].items() if user != thread))
+                if entry["ready"] and entry["dirty"]:
+                    self.teardown(entry)
+            if not entry["ready"]:
+                entry["state"] = setup()
+                entry["ready"] = True
+            entry["users"][thread] += 1
+            return entry["state"]
+
+    def release(self, scope, key):
+        # Runs the teardown only when the last running user has finished and nothing holds the scope open
+        thread = threading.get_ident()
+        with self.lock:
+            entry = self.entry(scope, key)
+            if entry["users"][thread] > 0:
+                entry["users"][thread] -= 1
+            if not +entry["users"] and not self.held[scope] and entry["ready"]:
+                self.teardown(entry)
+            self.condition.notify_all()
+
+    @contextmanager
+    def holding(self, scope):
+        with self.lock:
+            self.held[scope] += 1
+        try:
+            yield self
+        finally:
+            with self.lock:
+                self.held[scope] -= 1
+                if not self.held[scope]:
+                    self.end_scope(scope)
+
+    def mark_dirty(self, scope, key):
+        with self.lock:
+            self.entry(scope, key)["dirty"] = True
+
+    def end_scope(self, scope):
+        with self.lock:
+            for (entry_scope, key), entry in self.entries.items():
+                if entry_scope == scope:
+                    if entry["ready"]:
+                        self.teardown(entry)
+            self.condition.notify_all()
+
+    def teardown(self, entry):
+        if entry["teardown"]:
+            entry["teardown"]()
+        entry.update(state=None, ready=False, dirty=False, users=Counter())
+
+shared_preconditions = SharedPreconditions()
+
+def shared_cache_key(scope, cache_key):
+    if scope != "test" and cache_key is None:
+        raise ValueError(f"A {scope!r} scoped decorator needs a cache_key shared by its precondition and postcondition")
+    return cache_key
 
 
 class PreconditionDecorator(TestDecorator):
-def execute(self):
-self.setup_preconditions()
-super().execute()
+    def __init__(self, test_case, scope="test", cache_key=None):
+        super().__init__(test_case)
+        self.scope = scope
+        self.cache_key = shared_cache_key(scope, cache_key)
+        self.state = None
+
+    def execute(self):
+        self.acquire_preconditions()
+        super().execute()
 
-def setup_preconditions(self):
-print("Setting up preconditions...")
+    def acquire_preconditions(self):
+        if self.scope == "test":
+            self.state = self.setup_preconditions()
+        else:
+            self.state = shared_preconditions.acquire(self.scope, self.cache_key, self.setup_preconditions)
+
+    def setup_preconditions(self):
+        print("Setting up preconditions...")
+
+    def plan_steps(self):
+        return [self.acquire_preconditions], []
 
 
 
 class PostconditionDecorator(TestDecorator):
-def execute(self):
-super().execute()
-self.teardown_postconditions()
+    def __init__(self, test_case, scope="test", cache_key=None):
+        super().__init__(test_case)
+        self.scope = scope
+        self.cache_key = shared_cache_key(scope, cache_key)
+        if scope != "test":
+            shared_preconditions.register_teardown(scope, cache_key, self.teardown_postconditions)
+
+    def execute(self):
+        super().execute()
+        self.release_postconditions()
+
+    def release_postconditions(self):
+        if self.scope == "test":
+            self.teardown_postconditions()
+        else:
+            shared_preconditions.release(self.scope, self.cache_key)
 
-def teardown_postconditions(self):
-print("Cleaning up postconditions...")
+    def teardown_postconditions(self):
+        print("Cleaning up postconditions...")
+
+    def plan_steps(self):
+        return [], [self.release_postconditions]
+
+
+class BackgroundLogWriter:
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self.queue = queue.SimpleQueue()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def write(self, records):
+        self.queue.put(list(records))
+
+    def run(self):
+        while True:
+            records = self.queue.get()
+            if records is None:
+                break
+            for record in records:
+                self.stream.write(json.dumps(record) + "\n")
+            self.stream.flush()
+
+    def close(self):
+        # Writes everything still queued, then stops the writer thread
+        self.queue.put(None)
+        self.thread.join()
+
+default_log_writer = None
+
+def get_default_log_writer():
+    global default_log_writer
+    if default_log_writer is None:
+        default_log_writer = BackgroundLogWriter()
+        atexit.register(default_log_writer.close)  # the thread is a daemon, write the queued failures before exiting
+    return default_log_writer
 
 
 class LoggingDecorator(TestDecorator):
-def execute(self):
-self.log_start()
-super().execute()
-self.log_end()
+    def __init__(self, test_case, buffered=False, capacity=100, verbose=False, writer=None, name=None):
+        super().__init__(test_case)
+        self.buffered = buffered
+        self.verbose = verbose
+        self.writer = writer
+        self.name = name or type(test_case).__name__
+        self.records = deque(maxlen=capacity)
+
+    def execute(self):
+        if not self.buffered:
+            self.log_start()
+            super().execute()
+            self.log_end()
+            return
+        self.records.clear()
+        self.log_start()
+        try:
+            super().execute()
+        except Exception as e:
+            self.log("failed", level="ERROR", error=str(e))
+            self.write_records()
+            raise
+        self.log_end()
+        if self.verbose:
+            self.write_records()
+
+    def log(self, event, level="INFO", **fields):
+        self.records.append({"time": time.time(), "test": self.name, "level": level, "event": event, **fields})
+
+    def write_records(self):
+        (self.writer or get_default_log_writer()).write(self.records)
+
+    def log_start(self):
+        if self.buffered:
+            self.log("started")
+        else:
+            print("Starting test execution...")
+
+    def log_end(self):
+        if self.buffered:
+            self.log("completed")
+        else:
+            print("Test execution completed.")
+
+    def plan_steps(self):
+        if self.buffered:
+            return None
+        return [self.log_start], [self.log_end]
+
+
+class ExecutionPlan:
+    def __init__(self, steps):
+        self.steps = steps
+
+    def execute(self):
+        for step in self.steps:
+            step()
+
+def defining_class(cls, attribute):
+    for klass in cls.__mro__:
+        if attribute in vars(klass):
+            return klass
+
+def compile_plan(test_case):
+    before, after = [], []
+    node = test_case
+    while (isinstance(node, TestDecorator)
+           and defining_class(type(node), "execute") is defining_class(type(node), "plan_steps")
+           and node.plan_steps() is not None):
+        pre_steps, post_steps = node.plan_steps()
+        before.extend(pre_steps)
+        after[:0] = post_steps
+        node = node.test_case
+    return ExecutionPlan(before + [node.execute] + after)
+
+
+class DatabasePrecondition(PreconditionDecorator):
+    def setup_preconditions(self):
+        print("Seeding the test database...")
+        return {"users": ["user1", "admin"]}
+
+class QuietTestCase(TestCase):
+    def execute(self):
+        pass
+
+class QuietPreconditionDecorator(PreconditionDecorator):
+    def setup_preconditions(self):
+        pass
+
+class QuietPostconditionDecorator(PostconditionDecorator):
+    def teardown_postconditions(self):
+        pass
+
+class QuietLoggingDecorator(LoggingDecorator):
+    def log_start(self):
+        pass
+
+    def log_end(self):
+        pass
+
+def benchmark_decorator_chain(iterations=200_000):
+    # Uses no-op steps so the measurement is the cost of the layers, not of printing
+    nested = QuietPostconditionDecorator(QuietPreconditionDecorator(QuietLoggingDecorator(QuietTestCase())))
+    flat = compile_plan(nested)
+    nested_time = min(timeit.repeat(nested.execute, number=iterations, repeat=5))
+    flat_time = min(timeit.repeat(flat.execute, number=iterations, repeat=5))
+    print(f"Nested: {nested_time / iterations * 1e9:.0f} ns per test, "
+          f"flat: {flat_time / iterations * 1e9:.0f} ns per test, speedup {nested_time / flat_time:.2f}x")
+
+class FailingTestCase(TestCase):
+    def execute(self):
+        raise AssertionError("Checkout total is wrong")
+
+
+if __name__ == "__main__":
+    # Create a basic test case
+    test_case = TestCase()
 
-def log_start(self):
-print("Starting test execution...")
+    # Wrap it with logging, preconditions, and postconditions using decorators
+    test_with_logging = LoggingDecorator(test_case)
+    test_with_preconditions = PreconditionDecorator(test_with_logging)
+    test_with_postconditions = PostconditionDecorator(test_with_preconditions)
 
-def log_end(self):
-print("Test execution completed.")
+    # Execute the decorated test
+    test_with_postconditions.execute()
 
+    # Compile the same stack once and execute the flat plan, the output is identical
+    compile_plan(test_with_postconditions).execute()
 
-# Create a basic test case
-test_case = TestCase()
+    # Three tests share one suite-scoped precondition: one setup before the first, one cleanup after the last
+    shared_tests = [PostconditionDecorator(DatabasePrecondition(LoggingDecorator(TestCase()), scope="suite", cache_key="database"),
+                                           scope="suite", cache_key="database")
+                    for _ in range(3)]
+    with shared_preconditions.holding("suite"):
+        for shared_test in shared_tests:
+            shared_test.execute()
 
-# Wrap it with logging, preconditions, and postconditions using decorators
-test_with_logging = LoggingDecorator(test_case)
-test_with_preconditions = PreconditionDecorator(test_with_logging)
-test_with_postconditions = PostconditionDecorator(test_with_preconditions)
+    benchmark_decorator_chain()
 
-# Execute the decorated test
-test_with_postconditions.execute()
+    # Only the failing test writes its log records, the passing one stays silent
+    log_writer = BackgroundLogWriter()
+    for buffered_test in (LoggingDecorator(QuietTestCase(), buffered=True, writer=log_writer, name="test_search"),
+                          LoggingDecorator(FailingTestCase(), buffered=True, writer=log_writer, name="test_checkout")):
+        try:
+            buffered_test.execute()
+        except AssertionError:
+            pass
+    log_writer.close()
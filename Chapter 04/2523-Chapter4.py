@@ -288,16 +288,117 @@ def click_button(button_id):
 
 
 
+#The below code backs api_call with pooled keep-alive HTTP sessions instead of the module-level requests.get and requests.post,
+# which open a new TCP (and TLS) connection for every call.
+
+#Pooled Sessions (get_session):
+#get_session returns a requests.Session configured with an HTTPAdapter that keeps connections alive and reuses them.
+#POOL_CONNECTIONS is the number of hosts whose connection pools are cached, and POOL_MAXSIZE is the number of
+#connections kept open per host by one session.
+#Per-host limit: since every thread has its own session (see below), the adapter limit alone would allow one pool per thread.
+# api_call therefore also takes a slot from host_slot, a threading.BoundedSemaphore of POOL_MAXSIZE per host shared by
+# all threads of the process, so at most POOL_MAXSIZE requests to one host are in flight however many threads call it.
+#Sharing policy: a requests.Session is not guaranteed to be thread-safe, so every thread gets its own session (threading.local).
+# The session also remembers the process id that created it. A worker process forked from the main process never reuses
+# the parent's sockets; it builds a fresh session on its first call.
+#close_session closes the session of the current thread, for example at the end of a worker.
+
+#api_call Function:
+#The signature and return value are unchanged. Calls go through the pooled session, with DEFAULT_TIMEOUT
+# (connect and read timeouts in seconds) so a hanging service cannot block a test forever.
+
+#benchmark_api_call:
+#This function starts a local HTTP/1.1 server (http.server.ThreadingHTTPServer, which supports keep-alive) on a free port,
+#sends the same number of GET requests once with a new connection per request (requests.get) and once through api_call,
+#and prints the requests per second of each.
+
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
 import requests
+from requests.adapters import HTTPAdapter
+
+POOL_CONNECTIONS = 10
+POOL_MAXSIZE = 20
+DEFAULT_TIMEOUT = (3.05, 30)
+
+session_store = threading.local()
+host_slots = {}
+host_slots_lock = threading.Lock()
+
+def get_session():
+    session = getattr(session_store, "session", None)
+    if session is None or session_store.pid != os.getpid():
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, pool_block=True)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session_store.session = session
+        session_store.pid = os.getpid()
+    return session
+
+def close_session():
+    session = getattr(session_store, "session", None)
+    if session is not None:
+        session.close()
+        session_store.session = None
+
+def host_slot(endpoint):
+    key = (os.getpid(), urlsplit(endpoint).netloc)  # a forked worker gets fresh semaphores, not the parent's counts
+    with host_slots_lock:
+        if key not in host_slots:
+            host_slots[key] = threading.BoundedSemaphore(POOL_MAXSIZE)
+        return host_slots[key]
 
 def api_call(method, endpoint, data=None, headers=None):
-    if method == "GET":
-        response = requests.get(endpoint, headers=headers)
-    elif method == "POST":
-        response = requests.post(endpoint, json=data, headers=headers)
+    session = get_session()
+    with host_slot(endpoint):
+        if method == "GET":
+            response = session.get(endpoint, headers=headers, timeout=DEFAULT_TIMEOUT)
+        elif method == "POST":
+            response = session.post(endpoint, json=data, headers=headers, timeout=DEFAULT_TIMEOUT)
     return response
 
 
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # headers and body are separate writes, avoid the delayed-ACK stall on kept-alive sockets
+    delay = 0.0  # simulated service latency in seconds
+
+    def do_GET(self):
+        time.sleep(self.delay)
+        body = b'{"status": "ok"}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def benchmark_api_call(requests_count=500):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    endpoint = f"http://127.0.0.1:{server.server_address[1]}/health"
+    try:
+        start_time = time.perf_counter()
+        for _ in range(requests_count):
+            requests.get(endpoint, timeout=DEFAULT_TIMEOUT)
+        new_connections = requests_count / (time.perf_counter() - start_time)
+        start_time = time.perf_counter()
+        for _ in range(requests_count):
+            api_call("GET", endpoint)
+        pooled = requests_count / (time.perf_counter() - start_time)
+    finally:
+        server.shutdown()
+        server.server_close()
+    print(f"New connection per request: {new_connections:.0f} req/s, pooled keep-alive session: {pooled:.0f} req/s")
+
+
 #The below code contains a mix of database interaction and web form automation functionality. Here's a detailed explanation of each part:
 
 #Database Connection (db_connect):
@@ -317,6 +418,33 @@ def api_call(method, endpoint, data=None, headers=None):
 #Returns the query results to the caller.
 #This function is useful for retrieving data from the database but does not handle queries that modify data (e.g., INSERT, UPDATE, DELETE). 
 # Additionally, it lacks error handling, which could lead to unhandled exceptions if the query fails.
+
+#Connection Pool (ConnectionPool):
+#Opening a database connection (TCP handshake, authentication, backend start) usually costs far more than a short query,
+# so execute_query no longer connects for every query. It borrows a connection from db_pool, a ConnectionPool around db_connect.
+#The pool takes a connect function that returns a new DB-API connection, so the same pool works against SQLite
+# (for example lambda: sqlite3.connect(path, check_same_thread=False)) in tests of the pool itself. It:
+
+#Creates connections lazily, keeps at least min_size of them open once used, and never more than max_size.
+# When all max_size connections are borrowed, acquire waits up to timeout seconds for one to be released.
+#Gives a thread the connection it used last if that one is idle (worker affinity), so a worker keeps its warm
+# connection, with its session state and prepared statements, instead of a random one.
+#Checks a connection with health_check_query before handing it out when it has not been used for health_check_interval
+# seconds, and replaces a connection that fails the check or raised a database error while borrowed.
+#Detects that it is running in a forked worker (the process id changed) and drops the inherited connections without
+# closing them, because their sockets still belong to the parent process.
+#Rolls back the open transaction when a connection is released, so the next borrower starts clean, as with a fresh connection.
+#Caches prepared statements per connection when prepared_statements is set (PostgreSQL, off by default): a query text
+# that runs a second time on a connection is PREPAREd once and from then on only EXECUTEd. Only single statements of the
+# kinds PostgreSQL can prepare (SELECT, INSERT, UPDATE, DELETE, MERGE, VALUES, or a WITH query) are cached; anything else,
+# such as SHOW, EXPLAIN or CALL, runs as it is. At most statement_cache_size statements are kept per connection;
+# the least recently used one is deallocated. Caching pays off for queries repeated with the same text, not for
+# queries with inlined literals, which differ every time. SQLite drivers cache statements themselves.
+#Records with server_side_cursors whether the driver supports named cursors, which stream_query uses for large results.
+
+#benchmark_connection_pool:
+#This function runs the same query against a SQLite file once with a new connection per query and once through a pool,
+# and prints the queries per second of each.
 #Filling a Web Form (fill_form):
 #The fill_form function automates the process of populating a web form. 
 # It takes a dictionary (fields) where the keys represent the IDs of form fields, and the values represent the text to be entered. 
@@ -330,20 +458,226 @@ def api_call(method, endpoint, data=None, headers=None):
 # and clicks it using the click method. This function is typically used after the form fields have been populated using fill_form.
 
 import psycopg2
+from collections import OrderedDict
+from contextlib import contextmanager
 
 def db_connect():
     conn = psycopg2.connect(database="testdb", user="user", password="password", host="localhost", port="5432")
     return conn
 
+PREPARABLE_STATEMENTS = ("SELECT", "INSERT", "UPDATE", "DELETE", "MERGE", "VALUES", "WITH")
+
+def is_preparable(query):
+    statement = query.strip().rstrip(";")
+    if not statement or ";" in statement:
+        return False  # empty, or several statements, which PREPARE does not accept
+    return statement.split(None, 1)[0].upper() in PREPARABLE_STATEMENTS
+
+class PooledConnection:
+    def __init__(self, conn, prepared_statements, statement_cache_size):
+        self.conn = conn
+        self.prepared_statements = prepared_statements
+        self.statement_cache_size = statement_cache_size
+        self.statements = OrderedDict()
+        self.seen = OrderedDict()  # query texts run once, prepared when they come back
+        self.prepared_count = 0
+        self.last_used = time.monotonic()
+        self.broken = False
+
+    def cursor(self, *args, **kwargs):
+        return self.conn.cursor(*args, **kwargs)
+
+    def execute(self, cursor, query):
+        if not self.prepared_statements or not is_preparable(query):
+            cursor.execute(query)
+            return
+        name = self.statements.get(query)
+        if name is None and query not in self.seen:
+            self.seen[query] = True
+            if len(self.seen) > self.statement_cache_size:
+                self.seen.popitem(last=False)
+            cursor.execute(query)
+            return
+        if name is None:
+            del self.seen[query]
+            self.prepared_count += 1
+            name = f"stmt_{self.prepared_count}"
+            cursor.execute(f"PREPARE {name} AS {query}")
+            self.statements[query] = name
+            if len(self.statements) > self.statement_cache_size:
+                _, evicted = self.statements.popitem(last=False)
+                cursor.execute(f"DEALLOCATE {evicted}")
+        self.statements.move_to_end(query)
+        cursor.execute(f"EXECUTE {name}")
+
+    def close(self):
+        try:
+            self.conn.close()
+        except Exception:
+            pass
+
+class ConnectionPool:
+    def __init__(self, connect, min_size=1, max_size=10, timeout=30.0, health_check_query="SELECT 1",
+                 health_check_interval=30.0, prepared_statements=False, statement_cache_size=100,
+                 server_side_cursors=False):
+        self.connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check_query = health_check_query
+        self.health_check_interval = health_check_interval
+        self.prepared_statements = prepared_statements
+        self.statement_cache_size = statement_cache_size
+        self.server_side_cursors = server_side_cursors
+        self.condition = threading.Condition()
+        self.affinity = threading.local()
+        self.reset()
+
+    def reset(self):
+        self.pid = os.getpid()
+        self.idle = []
+        self.size = 0
+
+    def new_connection(self):
+        return PooledConnection(self.connect(), self.prepared_statements, self.statement_cache_size)
+
+    def is_healthy(self, pooled, force=False):
+        if not force and time.monotonic() - pooled.last_used < self.health_check_interval:
+            return True
+        try:
+            pooled.conn.rollback()
+            cursor = pooled.cursor()
+            cursor.execute(self.health_check_query)
+            cursor.fetchall()
+            pooled.conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def take_idle(self):
+        preferred = getattr(self.affinity, "connection", None)
+        if preferred is not None and preferred in self.idle:
+            self.idle.remove(preferred)
+            return preferred
+        return self.idle.pop()
+
+    def acquire(self):
+        deadline = time.monotonic() + self.timeout
+        with self.condition:
+            if self.pid != os.getpid():
+                self.reset()  # forked worker, the inherited sockets belong to the parent
+            while not self.idle and self.size >= self.max_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self.condition.wait(remaining):
+                    raise Exception(f"No database connection available within {self.timeout}s")
+            pooled = self.take_idle() if self.idle else None
+            self.size += pooled is None
+        if pooled is not None and not self.is_healthy(pooled):
+            pooled.close()
+            pooled = None
+        if pooled is None:
+            try:
+                pooled = self.new_connection()
+            except Exception:
+                with self.condition:
+                    self.size -= 1
+                    self.condition.notify()
+                raise
+        self.affinity.connection = pooled
+        return pooled
+
+    def release(self, pooled):
+        if not pooled.broken:
+            try:
+                pooled.conn.rollback()
+            except Exception:
+                pooled.broken = True
+        with self.condition:
+            if self.pid != os.getpid():
+                return
+            if pooled.broken:
+                pooled.close()
+                self.size -= 1
+            else:
+                pooled.last_used = time.monotonic()
+                self.idle.append(pooled)
+            self.condition.notify()
+
+    @contextmanager
+    def connection(self):
+        pooled = self.acquire()
+        try:
+            yield pooled
+        except Exception:
+            pooled.broken = not self.is_healthy(pooled, force=True)
+            raise
+        finally:
+            self.release(pooled)
+            self.fill()
+
+    def fill(self):
+        while True:
+            with self.condition:
+                if self.size >= self.min_size:
+                    return
+                self.size += 1
+            try:
+                pooled = self.new_connection()
+            except Exception:
+                with self.condition:
+                    self.size -= 1
+                return
+            self.release(pooled)
+
+    def close_all(self):
+        with self.condition:
+            idle, self.idle = self.idle, []
+            self.size -= len(idle)
+        for pooled in idle:
+            pooled.close()
+
+db_pool = ConnectionPool(db_connect, min_size=1, max_size=10, server_side_cursors=True)
+
 def execute_query(query):
-    conn = db_connect()
-    cursor = conn.cursor()
-    cursor.execute(query)
-    results = cursor.fetchall()
-    conn.close()
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        conn.execute(cursor, query)
+        results = cursor.fetchall()
     return results
 
 
+def benchmark_connection_pool(path, queries=2000):
+    import sqlite3
+
+    def connect():
+        return sqlite3.connect(path, check_same_thread=False)
+
+    setup = connect()
+    setup.execute("CREATE TABLE IF NOT EXISTS accounts (id INTEGER PRIMARY KEY, balance INTEGER)")
+    setup.execute("INSERT OR REPLACE INTO accounts VALUES (1, 100)")
+    setup.commit()
+    setup.close()
+    query = "SELECT balance FROM accounts WHERE id = 1"
+
+    start_time = time.perf_counter()
+    for _ in range(queries):
+        conn = connect()
+        conn.execute(query).fetchall()
+        conn.close()
+    per_query = queries / (time.perf_counter() - start_time)
+
+    pool = ConnectionPool(connect, min_size=1, max_size=4)
+    start_time = time.perf_counter()
+    for _ in range(queries):
+        with pool.connection() as conn:
+            cursor = conn.cursor()
+            conn.execute(cursor, query)
+            cursor.fetchall()
+    pooled = queries / (time.perf_counter() - start_time)
+    pool.close_all()
+    print(f"New connection per query: {per_query:.0f} queries/s, pooled connection: {pooled:.0f} queries/s")
+
+
 def fill_form(fields):
     for field, value in fields.items():
         driver.find_element_by_id(field).send_keys(value)
@@ -369,14 +703,43 @@ def submit_form(button_id):
 #Optionally, if expected_columns is provided, it asserts that the number of columns in the first row 
 #of the results matches the length of expected_columns.
 #This function is helpful for validating database query results, ensuring that the structure of the data aligns with expectations.
+#With stream=True it returns a generator of rows (stream_query) instead of a list, for result sets too large to hold in memory.
+
+#stream_query:
+#This generator runs a query on a pooled connection and yields the rows one at a time while fetching them in batches
+# of batch_size with cursor.fetchmany, so only one batch is in memory at any moment. It:
+
+#Uses a named (server-side) cursor when the pool has server_side_cursors set (PostgreSQL through psycopg2), so the
+# database keeps the result set and sends batch_size rows per round trip. Other drivers use a regular cursor.
+#Validates expected_columns against cursor.description, the column metadata of the result, before yielding any row.
+# A regular cursor has it right after execute; a named cursor has it after the first batch arrives.
+#Keeps the connection borrowed until the generator is exhausted or closed, then returns it to the pool.
+
+#benchmark_streaming_fetch:
+#This function fills a SQLite table and compares the peak memory (tracemalloc) of counting its rows
+# through fetch_data with and without streaming.
 #api_call_with_retry:
 #This function performs an API call with a retry mechanism. It:
 
 #Attempts the API call (using the api_call function) up to a specified number of retries (retries, default is 3).
-#If the response has a status code of 200 (success), it returns the response.
-#If an exception occurs during the API call, it prints an error message with the attempt number and continues retrying.
+#If the response is successful (a status code below 400), it returns the response.
+#Only transient failures are retried: connection errors, timeouts and the status codes in RETRYABLE_STATUS_CODES
+# (408, 425, 429, 500, 502, 503, 504). Any other error status, such as 400 or 404, fails at once because repeating
+# the same request cannot change the answer.
+#Between attempts it waits with exponential backoff and full jitter: a random delay between 0 and
+# base_delay * 2 ** attempt, capped at max_delay, so workers that failed together do not retry together.
+# A numeric Retry-After header of a 429 or 503 response is used instead when present.
+#Every retry is paid from retry_budget, a RetryBudget shared by all calls in the process. Each call adds
+# RETRY_BUDGET_RATIO tokens (up to RETRY_BUDGET_MAX), each retry takes one, so retries stay a small share of the traffic.
+# When the budget is empty the call fails instead of retrying.
+#Each endpoint (scheme, host and path) has a CircuitBreaker shared by all tests in the process (get_circuit_breaker).
+# After failure_threshold consecutive failures (connection errors, timeouts, retryable status codes, unexpected errors) the breaker opens and
+# every call to that endpoint raises CircuitOpenError immediately, without a request. After reset_timeout seconds one
+# trial call is let through: a success closes the breaker, a failure opens it again. A trial that ends without
+# reporting either way is timed out after another reset_timeout seconds, and the next call becomes the trial.
 #If all retries fail, it raises an exception indicating that the API call failed after multiple attempts.
-#This function is useful for handling transient issues in API calls, such as network instability or temporary server errors.
+#This function is useful for handling transient issues in API calls, such as network instability or temporary server errors,
+# while a service that is clearly down makes the tests fail fast instead of each one burning its full retry budget.
 #assert_element_visible:
 #This function checks whether a web element is visible on the page. It:
 
@@ -393,24 +756,178 @@ def verify_api_response(response, expected_status_code, expected_data=None):
 
 
 
-def fetch_data(query, expected_columns=None):
+def fetch_data(query, expected_columns=None, stream=False, batch_size=10000):
+    if stream:
+        return stream_query(query, expected_columns, batch_size)
     results = execute_query(query)
     if expected_columns:
         assert len(results[0]) == len(expected_columns)
     return results
 
-
-
-def api_call_with_retry(method, endpoint, retries=3):
-    attempt = 0
-    while attempt < retries:
+def check_columns(description, expected_columns):
+    columns = [column[0] for column in description]
+    assert len(columns) == len(expected_columns), f"Expected columns {list(expected_columns)}, got {columns}"
+
+def stream_query(query, expected_columns=None, batch_size=10000, pool=None):
+    pool = pool or db_pool
+    with pool.connection() as conn:
+        if pool.server_side_cursors:
+            cursor = conn.cursor(f"stream_{threading.get_ident()}_{time.monotonic_ns()}")
+            cursor.itersize = batch_size
+            cursor.execute(query)
+        else:
+            cursor = conn.cursor()
+            cursor.execute(query)
+        columns_checked = not expected_columns
+        if not columns_checked and cursor.description is not None:
+            check_columns(cursor.description, expected_columns)
+            columns_checked = True
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not columns_checked:
+                check_columns(cursor.description, expected_columns)
+                columns_checked = True
+            if not rows:
+                break
+            yield from rows
+        cursor.close()
+
+
+def benchmark_streaming_fetch(path, rows=200000):
+    import sqlite3
+    import tracemalloc
+
+    global db_pool
+    setup = sqlite3.connect(path)
+    setup.execute("DROP TABLE IF EXISTS reconciliation")
+    setup.execute("CREATE TABLE reconciliation (id INTEGER PRIMARY KEY, account TEXT, amount REAL)")
+    setup.executemany("INSERT INTO reconciliation VALUES (?, ?, ?)",
+                      ((i, f"ACC-{i:08d}", i * 0.01) for i in range(rows)))
+    setup.commit()
+    setup.close()
+
+    query = "SELECT id, account, amount FROM reconciliation"
+    columns = ["id", "account", "amount"]
+    default_pool = db_pool
+    db_pool = ConnectionPool(lambda: sqlite3.connect(path, check_same_thread=False))
+    try:
+        for stream in (False, True):
+            tracemalloc.start()
+            count = sum(1 for _ in fetch_data(query, columns, stream=stream))
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"{'Streaming' if stream else 'fetchall'}: {count} rows, peak memory {peak / 1024 ** 2:.1f} MiB")
+    finally:
+        db_pool.close_all()
+        db_pool = default_pool
+
+
+
+import random
+
+RETRYABLE_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+RETRY_BUDGET_RATIO = 0.2
+RETRY_BUDGET_MAX = 10.0
+
+class CircuitOpenError(Exception):
+    pass
+
+class RetryBudget:
+    def __init__(self, ratio=RETRY_BUDGET_RATIO, max_tokens=RETRY_BUDGET_MAX):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self.lock = threading.Lock()
+
+    def deposit(self):
+        with self.lock:
+            self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def withdraw(self):
+        with self.lock:
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.state == "closed":
+                return True
+            # A trial that never reported back times out like an open breaker, so the endpoint cannot stay blocked
+            if time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"  # let exactly one trial call through
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.state = "closed"
+            self.failures = 0
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+retry_budget = RetryBudget()
+circuit_breakers = {}
+circuit_breakers_lock = threading.Lock()
+
+def get_circuit_breaker(endpoint):
+    parts = urlsplit(endpoint)
+    key = (parts.scheme, parts.netloc, parts.path)
+    with circuit_breakers_lock:
+        if key not in circuit_breakers:
+            circuit_breakers[key] = CircuitBreaker()
+        return circuit_breakers[key]
+
+def backoff_delay(attempt, base_delay, max_delay, response=None):
+    retry_after = response.headers.get("Retry-After", "") if response is not None else ""
+    if retry_after.isdigit():
+        return min(max_delay, float(retry_after))
+    return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+def api_call_with_retry(method, endpoint, retries=3, base_delay=0.1, max_delay=5.0):
+    breaker = get_circuit_breaker(endpoint)
+    retry_budget.deposit()
+    for attempt in range(retries):
+        if attempt and not retry_budget.withdraw():
+            raise Exception("API call failed, retry budget exhausted")
+        if not breaker.allow():
+            raise CircuitOpenError(f"Circuit open for {endpoint}, failing fast")
+        response = None
         try:
             response = api_call(method, endpoint)
-            if response.status_code == 200:
-                return response
-        except Exception as e:
+        except (requests.ConnectionError, requests.Timeout) as e:
+            breaker.record_failure()
             print(f"Attempt {attempt + 1} failed: {e}")
-        attempt += 1
+        except BaseException:
+            breaker.record_failure()  # every call the breaker let through reports back, or a half-open trial never ends
+            raise
+        else:
+            if response.status_code < 400:
+                breaker.record_success()
+                return response
+            if response.status_code not in RETRYABLE_STATUS_CODES:
+                breaker.record_success()  # the service answered, the request itself is wrong
+                raise Exception(f"API call failed with non-retryable status {response.status_code}")
+            breaker.record_failure()
+            print(f"Attempt {attempt + 1} failed: status {response.status_code}")
+        if attempt + 1 < retries:
+            time.sleep(backoff_delay(attempt, base_delay, max_delay, response))
     raise Exception("API call failed after multiple retries")
 
 
@@ -419,6 +936,91 @@ def assert_element_visible(element_id):
     assert element.is_displayed(), f”Element {element_id} is not visible”
 
 
+#The below code is an asynchronous counterpart of api_call and verify_api_response for contract tests 
+# that send thousands of independent requests.
+
+#bulk_verify_api:
+#This coroutine takes a batch of specs, each a tuple (method, endpoint, payload, expected_status, expected_data), and:
+
+#Runs api_call for every spec on a thread pool through asyncio (each thread uses its own pooled session from get_session),
+# so the requests wait on the network concurrently instead of one after another.
+#Limits the number of requests in flight to concurrency (an asyncio.Semaphore), and the number of requests to a single host
+# to per_host_limit (one more semaphore per host), so the service under test is not flooded.
+# A request takes its host slot before its global slot, so requests waiting for a busy host leave the global slots
+# to requests for other hosts.
+#Checks each response with verify_api_response and records a verdict: the spec, passed, the error for a failed check, and the latency.
+#Returns the verdicts in the order of the specs, together with latency statistics (min, median, p95, max, mean) and the throughput.
+#verify_api_batch is the synchronous entry point for test code that does not run an event loop itself.
+
+#benchmark_bulk_verify:
+#This function starts the local stub server with a simulated latency and verifies the same batch serially and with verify_api_batch,
+# printing the wall time of each.
+
+import asyncio
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+async def bulk_verify_api(specs, concurrency=50, per_host_limit=20):
+    loop = asyncio.get_running_loop()
+    limit = asyncio.Semaphore(concurrency)
+    host_limits = {}
+
+    def call_and_verify(method, endpoint, payload, expected_status, expected_data):
+        start_time = time.perf_counter()
+        try:
+            response = api_call(method, endpoint, data=payload)
+            verify_api_response(response, expected_status, expected_data)
+            passed, error = True, None
+        except Exception as e:
+            passed, error = False, f"{type(e).__name__}: {e}"
+        return passed, error, time.perf_counter() - start_time
+
+    async def run_spec(executor, spec):
+        method, endpoint, payload, expected_status, expected_data = spec
+        host_limit = host_limits.setdefault(urlsplit(endpoint).netloc, asyncio.Semaphore(per_host_limit))
+        async with host_limit, limit:  # host first, so tasks queued behind one host never hold global slots
+            passed, error, latency = await loop.run_in_executor(executor, call_and_verify, *spec)
+        return {"method": method, "endpoint": endpoint, "passed": passed, "error": error, "latency": latency}
+
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        verdicts = await asyncio.gather(*(run_spec(executor, spec) for spec in specs))
+    wall_time = time.perf_counter() - start_time
+
+    latencies = sorted(verdict["latency"] for verdict in verdicts)
+    stats = {"requests": len(verdicts), "passed": sum(verdict["passed"] for verdict in verdicts),
+             "wall_time": wall_time, "requests_per_second": len(verdicts) / wall_time if wall_time else 0.0}
+    if latencies:
+        stats.update(min=latencies[0], median=statistics.median(latencies),
+                     p95=latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+                     max=latencies[-1], mean=statistics.fmean(latencies))
+    return verdicts, stats
+
+def verify_api_batch(specs, concurrency=50, per_host_limit=20):
+    return asyncio.run(bulk_verify_api(specs, concurrency, per_host_limit))
+
+
+class SlowStubHandler(StubHandler):
+    delay = 0.05
+
+def benchmark_bulk_verify(requests_count=200):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlowStubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    endpoint = f"http://127.0.0.1:{server.server_address[1]}/contract"
+    specs = [("GET", endpoint, None, 200, {"status": "ok"})] * requests_count
+    try:
+        start_time = time.perf_counter()
+        for method, spec_endpoint, payload, expected_status, expected_data in specs:
+            verify_api_response(api_call(method, spec_endpoint, payload), expected_status, expected_data)
+        serial_time = time.perf_counter() - start_time
+        verdicts, stats = verify_api_batch(specs)
+    finally:
+        server.shutdown()
+        server.server_close()
+    print(f"Serial: {serial_time:.2f}s, concurrent: {stats['wall_time']:.2f}s "
+          f"({stats['passed']}/{stats['requests']} passed, p95 latency {stats['p95'] * 1000:.1f}ms)")
+
+
 #The below code defines a LoginPage class and a test_login_success function, 
 # which together implement a basic structure for automating the login process of a web application using Selenium.
 
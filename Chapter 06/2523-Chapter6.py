@@ -44,48 +44,780 @@
 #The test cases are added to the runner using add_test_case.#The tests are executed using run_tests.
 #The results are reported using report_results.
 
+#Parallel Execution:
+#run_tests accepts a workers argument. With workers=1 (the default) the test cases run one after another, exactly as above.
+#With workers=N the runner sends the TestCase objects to a pool of N worker processes (multiprocessing.Pool).
+#Each worker runs one test case and sends back (index, duration, passed, error_message), where index is the position of the
+#test case in the list being run, so the runner finds its TestCase without depending on the order of completion; the runner streams these
+#as (test_case, duration, passed, error_message) in the order the cases finish and copies the outcome onto its own TestCase.
+#Once the run is over, results are put back into the order the test cases were added, so report_results prints exactly
+#the same output as the serial mode.
 
+#Rule for test functions that cannot be pickled:
+#A worker process receives the test function by pickling it, which only works for functions defined at module level.
+#Lambdas, closures, nested functions and bound methods of unpicklable objects cannot be sent to a worker.
+#The runner checks every test function before submitting it; the ones that cannot be pickled are not an error,
+#they are run in the main process, serially, after the pool has finished. Write shared test functions at module level
+#to get the benefit of the pool. The usage example is guarded by if __name__ == "__main__" so that worker processes
+#started with the "spawn" method (the default on Windows and macOS) do not run it again.
+
+#Longest-First Scheduling:
+#TestRunner accepts an optional history_file. When it is given, the duration of every test case is saved to that JSON file
+#at the end of run_tests (smoothed with the previous value), and the next run uses it through the DurationHistory class.
+#Before running, schedule_longest_first orders the test cases longest-first and assigns them to the least loaded worker
+#(the LPT bin-packing rule), so a few long tests start early instead of being left alone at the end of the run.
+#A test case with no history gets an estimated cost: the median of the known durations, or default_cost if nothing is known yet.
+#The largest worker load is the predicted makespan; report_results prints it next to the actual wall time of the run.
+
+#Async Test Functions:
+#A test function can also be a coroutine function (async def). TestCase detects this with inspect.iscoroutinefunction
+#and sets is_async; run_async awaits the coroutine so its outcome is recorded instead of an un-awaited coroutine counting as passed.
+#run_tests takes the async test cases out of the list and runs them concurrently on a single event loop (asyncio.run),
+#with at most concurrency of them in flight at a time (an asyncio.Semaphore). I/O-bound checks that mostly wait on sockets
+#then overlap their waiting time. Async test cases always run in the main process, after the synchronous ones.
+
+#Result Sinks:
+#TestRunner accepts a list of sinks. Every result is handed to each sink through record_result as soon as the test case
+#finishes, and each sink writes and flushes it straight away:
+#JsonlResultSink writes one JSON line per result, JUnitXmlResultSink writes one <testcase> element per result,
+#and ConsoleResultSink prints the same line report_results would print.
+#With keep_results=False the runner no longer keeps the results list at all, so memory does not grow with the suite size.
+#Because every line is flushed, the file of an interrupted run still holds every finished result:
+#report_results(results_file="results.jsonl") rebuilds the summary from a JSONL file using load_results.
+#The sinks stay open across run_tests calls, so one runner can run several times into the same files. Close them with
+#TestRunner.close(), or use the runner as a context manager (with TestRunner(sinks=[...]) as runner:), which also
+#writes the closing </testsuite> of the JUnit XML file.
+
+#Profiling:
+#TestRunner accepts an optional TestProfiler. When it is set, every synchronous test case runs through TestProfiler.profile,
+#which records the wall time with time.perf_counter_ns and the CPU time of the running thread with time.thread_time_ns.
+#A StackSampler thread also starts with each test case. It sleeps for threshold seconds first, so short tests are never sampled;
+#if the test is still running after that, it samples the test thread's stack every interval seconds (sys._current_frames).
+#The samples are written to output_dir as one <test name>.collapsed file per test, in the collapsed-stack format
+#("frame;frame;frame count") read by flamegraph.pl and speedscope, which shows the hot keyword or fixture directly.
+#The profiler only holds its settings, so it is pickled to the worker processes along with the test case.
+#Async test cases share one thread and are not profiled. report_results lists the profile of each test after the results.
+
+#Result Cache:
+#A TestCase can take params (the inputs of a data-driven test, passed to the test function as arguments) and can be marked
+#deterministic=True when its outcome depends only on its code and inputs. TestRunner accepts an optional cache_file;
+#when it is set, each deterministic test case is fingerprinted before the run with test_fingerprint, a SHA-256 hash of
+#the function bytecode and constants, the values of the globals and closure cells it references (followed recursively
+#into the functions it calls) and its params. A test whose fingerprint matches the one stored after its last pass is not run,
+#it is listed under "Cached" by report_results instead. Failures are never cached, so a failing test always runs again.
+#Classes and modules are fingerprinted by name only, so a test that depends on a changed method must not be marked deterministic.
+
+#Compact Result Storage:
+#TestCase declares __slots__, so each instance has no per-object __dict__. TestRunner.results is a ResultStore instead of
+#a list of tuples: status codes go into an array of bytes, durations and run positions into typed arrays, test names
+#are interned with sys.intern and error messages are kept in a dict only for the failures. This keeps the cost of a result
+#to a few bytes plus its name, which matters for data-driven suites expanded to millions of rows.
+#ResultStore keeps the list API the rest of the runner uses: append((test_case, duration)), len() and iteration,
+#which yields (ResultView, duration) pairs. A ResultView is a small view over one row with the name, passed and
+#error_message attributes of a TestCase, so report_results and the sinks work on it unchanged.
+
+#Performance Budgets:
+#A TestCase can take a PerformanceBudget, so a test only passes if it doesn't exceed a specific benchmark.
+#After the test function has passed once, PerformanceBudget.measure runs it warmup more times without timing them,
+#then repeats more times timed with time.perf_counter, and compares the median (or p95) against max_seconds.
+#The verdict is noise-aware: the relative median absolute deviation of the samples widens the allowed margin.
+#A value under the budget is "within", a value over the budget but inside the margin is "noisy" (the test passes with a note),
+#and anything beyond the margin is "over": the test fails with over_budget=True. report_results marks an overrun with ⏱
+#instead of ✗, so a performance regression is never mistaken for a functional failure. Budgets apply to synchronous tests.
+#The budget is measured by run_test_case after the functional run has been timed, so the duration reported to the sinks and
+#the duration history is that of the single functional run, not of the warm-up and repeats.
+
+#Fail-Fast:
+#run_tests accepts max_failures. Every failure is counted in record_result; once the count reaches max_failures the runner
+#sets stopping and no new test case is started. In serial mode the loop simply ends. In parallel mode run_parallel only keeps
+#as many test cases in flight as there are workers, so nothing is queued ahead; after the cap is hit the test cases already running
+#get grace_period seconds to finish, and the worker processes still busy after that are terminated. Async test cases still waiting
+#for the semaphore are not started, and the ones in flight are cancelled after the same grace period.
+#Everything finished so far is recorded and reported as usual; the test cases that were never run or were cancelled are listed
+#by report_results after the results, so a broken smoke test stops the build in seconds instead of running the whole suite.
+
+#Sharding and Merging:
+#run_tests accepts shard=(index, count), with index counted from 1, and runs only the test cases select_shard assigns to that shard.
+#With shard_by="hash" a test case goes to the shard given by a SHA-1 hash of its name, which is the same on every machine
+#(unlike Python's built-in hash). With shard_by="duration" the test cases are spread over the shards with the LPT rule using the
+#history_file durations, so every machine must use the same history file to get the same assignment.
+#shard_by="duration" without a history_file raises ValueError instead of quietly falling back to hash sharding.
+#merge_results combines the JSONL result files of all shards into one ResultStore and detects test cases reported by more than
+#one shard (duplicated) and test cases of the suite reported by no shard (missing).
+#The same is available from the command line for CI machines:
+#python 2523-Chapter6.py run --shard 3/12 --results shard-3.jsonl
+#python 2523-Chapter6.py merge shard-*.jsonl
+#merge prints the report_results summary and the duplicated and missing test cases, and exits with status 1 if there are any.
+
+
+import argparse
+import asyncio
+import hashlib
+import heapq
+import inspect
+import json
 import os
+import pickle
+import re
+import statistics
+import sys
+import threading
 import time
+from array import array
+from collections import Counter
+from multiprocessing import Pool
+from queue import Empty, SimpleQueue
+from xml.sax.saxutils import escape, quoteattr
 
 class TestCase:
-    def __init__(self, name, test_function):
+    __slots__ = ("name", "test_function", "params", "deterministic", "budget", "passed", "error_message",
+                 "over_budget", "is_async")
+
+    def __init__(self, name, test_function, params=(), deterministic=False, budget=None):
         self.name = name
         self.test_function = test_function
+        self.params = tuple(params)
+        self.deterministic = deterministic
+        self.budget = budget
         self.passed = False
         self.error_message = None
+        self.over_budget = False
+        self.is_async = inspect.iscoroutinefunction(test_function)
 
     def run(self):
+        if self.is_async:
+            asyncio.run(self.run_async())
+            return
         try:
-            self.test_function()
+            self.test_function(*self.params)
             self.passed = True
         except Exception as e:
             self.error_message = str(e)
             self.passed = False
 
-class TestRunner:
+    def check_budget(self):
+        try:
+            verdict, statistic, spread = self.budget.measure(self.test_function, self.params)
+        except Exception as e:
+            self.error_message = str(e)
+            self.passed = False
+            return
+        summary = f"{self.budget.statistic} {statistic:.6f}s vs budget {self.budget.max_seconds:.6f}s (noise {spread:.1%})"
+        if verdict == "over":
+            self.passed = False
+            self.over_budget = True
+            self.error_message = f"Over budget: {summary}"
+        elif verdict == "noisy":
+            self.error_message = f"Within noise of budget: {summary}"
+
+    async def run_async(self):
+        try:
+            await self.test_function(*self.params)
+            self.passed = True
+        except Exception as e:
+            self.error_message = str(e)
+            self.passed = False
+
+class ResultView:
+    __slots__ = ("store", "index")
+
+    def __init__(self, store, index):
+        self.store = store
+        self.index = index
+
+    @property
+    def name(self):
+        return self.store.names[self.index]
+
+    @property
+    def passed(self):
+        return self.store.statuses[self.index] == ResultStore.PASSED
+
+    @property
+    def error_message(self):
+        return self.store.errors.get(self.index)
+
+    @property
+    def over_budget(self):
+        return self.store.statuses[self.index] == ResultStore.OVER_BUDGET
+
+class ResultStore:
+    FAILED = 0
+    PASSED = 1
+    OVER_BUDGET = 2
+
     def __init__(self):
+        self.names = []
+        self.statuses = array("b")
+        self.durations = array("d")
+        self.positions = array("q")
+        self.errors = {}
+
+    def add(self, name, passed, duration, error_message=None, position=-1, over_budget=False):
+        index = len(self.durations)
+        self.names.append(sys.intern(name))
+        self.statuses.append(self.OVER_BUDGET if over_budget else self.PASSED if passed else self.FAILED)
+        self.durations.append(duration)
+        self.positions.append(position)
+        if error_message is not None:
+            self.errors[index] = error_message
+
+    def append(self, result, position=-1):
+        test_case, duration = result
+        self.add(test_case.name, test_case.passed, duration, test_case.error_message, position, test_case.over_budget)
+
+    def sort_by_position(self):
+        order = sorted(range(len(self)), key=self.positions.__getitem__)
+        self.names = [self.names[index] for index in order]
+        self.statuses = array("b", (self.statuses[index] for index in order))
+        self.durations = array("d", (self.durations[index] for index in order))
+        self.positions = array("q", (self.positions[index] for index in order))
+        new_index = {old: new for new, old in enumerate(order) if old in self.errors}
+        self.errors = {new_index[old]: message for old, message in self.errors.items()}
+
+    def __len__(self):
+        return len(self.durations)
+
+    def __getitem__(self, index):
+        return ResultView(self, index), self.durations[index]
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+class PerformanceBudget:
+    def __init__(self, max_seconds, warmup=2, repeats=10, statistic="median", noise_margin=0.05):
+        self.max_seconds = max_seconds
+        self.warmup = warmup
+        self.repeats = repeats
+        self.statistic = statistic
+        self.noise_margin = noise_margin
+
+    def measure(self, test_function, params=()):
+        for _ in range(self.warmup):
+            test_function(*params)
+        samples = []
+        for _ in range(self.repeats):
+            start_time = time.perf_counter()
+            test_function(*params)
+            samples.append(time.perf_counter() - start_time)
+        median = statistics.median(samples)
+        if self.statistic == "p95" and len(samples) > 1:
+            value = statistics.quantiles(samples, n=20, method="inclusive")[18]
+        else:
+            value = median
+        spread = statistics.median(abs(sample - median) for sample in samples) / median if median else 0.0
+        if value <= self.max_seconds:
+            verdict = "within"
+        elif value <= self.max_seconds * (1 + max(self.noise_margin, spread)):
+            verdict = "noisy"
+        else:
+            verdict = "over"
+        return verdict, value, spread
+
+class DurationHistory:
+    def __init__(self, path, default_cost=1.0, smoothing=0.5):
+        self.path = path
+        self.default_cost = default_cost
+        self.smoothing = smoothing
+        self.durations = {}
+        self.median = None  # cost of an unknown test, computed once and reset by record
+        if os.path.exists(path):
+            with open(path) as history_file:
+                self.durations = json.load(history_file)
+
+    def estimate(self, name):
+        if name in self.durations:
+            return self.durations[name]
+        if not self.durations:
+            return self.default_cost
+        if self.median is None:
+            self.median = statistics.median(self.durations.values())
+        return self.median
+
+    def record(self, name, duration):
+        self.median = None
+        previous = self.durations.get(name)
+        if previous is None:
+            self.durations[name] = duration
+        else:
+            self.durations[name] = self.smoothing * duration + (1 - self.smoothing) * previous
+
+    def save(self):
+        with open(self.path, "w") as history_file:
+            json.dump(self.durations, history_file, indent=2)
+
+class ResultCache:
+    def __init__(self, path):
+        self.path = path
+        self.fingerprints = {}
+        if os.path.exists(path):
+            with open(path) as cache_file:
+                self.fingerprints = json.load(cache_file)
+
+    def is_cached(self, name, fingerprint):
+        return self.fingerprints.get(name) == fingerprint
+
+    def record(self, name, fingerprint, passed):
+        if passed:
+            self.fingerprints[name] = fingerprint
+        else:
+            self.fingerprints.pop(name, None)
+
+    def save(self):
+        with open(self.path, "w") as cache_file:
+            json.dump(self.fingerprints, cache_file, indent=2)
+
+class StackSampler(threading.Thread):
+    def __init__(self, thread_id, threshold, interval):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.threshold = threshold
+        self.interval = interval
+        self.samples = Counter()
+        self.stopped = threading.Event()
+
+    def run(self):
+        if self.stopped.wait(self.threshold):
+            return
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(f"{frame.f_code.co_name} ({os.path.basename(frame.f_code.co_filename)})")
+                frame = frame.f_back
+            self.samples[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+class TestProfiler:
+    def __init__(self, output_dir="profiles", threshold=0.1, interval=0.005):
+        self.output_dir = output_dir
+        self.threshold = threshold
+        self.interval = interval
+
+    def profile(self, test_case):
+        sampler = StackSampler(threading.get_ident(), self.threshold, self.interval)
+        sampler.start()
+        wall_start = time.perf_counter_ns()
+        cpu_start = time.thread_time_ns()
+        test_case.run()
+        cpu_ns = time.thread_time_ns() - cpu_start
+        wall_ns = time.perf_counter_ns() - wall_start
+        sampler.stop()
+        profile_file = self.write_collapsed(test_case.name, sampler.samples) if sampler.samples else None
+        return {"wall_ns": wall_ns, "cpu_ns": cpu_ns, "profile_file": profile_file}
+
+    def write_collapsed(self, name, samples):
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, re.sub(r"[^\w.-]+", "_", name) + ".collapsed")
+        with open(path, "w", encoding="utf-8") as profile_file:
+            for stack, count in samples.most_common():
+                profile_file.write(f"{stack} {count}\n")
+        return path
+
+class JsonlResultSink:
+    def __init__(self, path):
+        self.file = open(path, "w", encoding="utf-8")
+
+    def write(self, test_case, duration):
+        record = {"name": test_case.name, "passed": test_case.passed, "duration": duration,
+                  "error_message": test_case.error_message, "over_budget": test_case.over_budget}
+        self.file.write(json.dumps(record) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+class JUnitXmlResultSink:
+    def __init__(self, path, suite_name="TestRunner"):
+        self.file = open(path, "w", encoding="utf-8")
+        self.file.write(f'<?xml version="1.0" encoding="UTF-8"?>\n<testsuite name={quoteattr(suite_name)}>\n')
+        self.file.flush()
+
+    def write(self, test_case, duration):
+        element = f'  <testcase name={quoteattr(test_case.name)} time="{duration:.4f}"'
+        if test_case.passed:
+            element += "/>\n"
+        else:
+            message = test_case.error_message or ""
+            failure_type = "budget" if test_case.over_budget else "functional"
+            element += (f">\n    <failure type=\"{failure_type}\" message={quoteattr(message)}>{escape(message)}</failure>\n"
+                        "  </testcase>\n")
+        self.file.write(element)
+        self.file.flush()
+
+    def close(self):
+        self.file.write("</testsuite>\n")
+        self.file.close()
+
+class ConsoleResultSink:
+    def write(self, test_case, duration):
+        print(format_result(test_case, duration), flush=True)
+
+    def close(self):
+        pass
+
+class TestRunner:
+    def __init__(self, history_file=None, sinks=None, keep_results=True, profiler=None, cache_file=None):
         self.test_cases = []
-        self.results = []
+        self.results = ResultStore()
+        self.positions = {}
+        self.cache = ResultCache(cache_file) if cache_file else None
+        self.fingerprints = {}
+        self.cached = []
+        self.profiler = profiler
+        self.profiles = {}
+        self.sinks = sinks or []
+        self.keep_results = keep_results
+        self.history = DurationHistory(history_file) if history_file else None
+        self.predicted_makespan = None
+        self.actual_makespan = None
+        self.failures = 0
+        self.stopping = False
+        self.cancelled = []
 
     def add_test_case(self, test_case):
         self.test_cases.append(test_case)
 
-    def run_tests(self):
-        for test_case in self.test_cases:
-            start_time = time.time() //tracks execution time of test
-            test_case.run()
-            duration = time.time() - start_time
-            self.results.append((test_case, duration))
+    def close(self):
+        # The sinks belong to the runner, not to one run, so several run_tests calls can write to them
+        for sink in self.sinks:
+            sink.close()
 
-    def report_results(self):
-        print("\nTest Results:")
-        for test_case, duration in self.results: //test will only pass if doesn’t exceed specific benchmark
-            if test_case.passed:
-                print(f"✓ {test_case.name} - Passed (Duration: {duration:.4f}s)")
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def run_tests(self, workers=1, concurrency=10, max_failures=None, grace_period=10.0, shard=None, shard_by="hash"):
+        self.max_failures = max_failures
+        self.failures = 0
+        self.stopping = False
+        self.cancelled = []
+        test_cases = self.test_cases
+        self.positions = {id(test_case): index for index, test_case in enumerate(self.test_cases)}
+        if shard:
+            if shard_by not in ("hash", "duration"):
+                raise ValueError(f"Unknown shard_by {shard_by!r}, expected 'hash' or 'duration'")
+            if shard_by == "duration" and not self.history:
+                # Falling back to hash sharding would give this machine a different assignment than the others
+                raise ValueError("shard_by='duration' needs a history_file")
+            test_cases = select_shard(test_cases, shard, self.history if shard_by == "duration" else None)
+        if self.cache:
+            test_cases = self.skip_cached(test_cases)
+        if self.history:
+            test_cases, self.predicted_makespan = schedule_longest_first(test_cases, self.history, workers)
+        async_cases = [test_case for test_case in test_cases if test_case.is_async]
+        test_cases = [test_case for test_case in test_cases if not test_case.is_async]
+        run_start = time.time()
+        if workers > 1:
+            for test_case, duration, passed, error_message in self.run_parallel(workers, test_cases, grace_period):
+                self.record_result(test_case, duration)
+        else:
+            for position, test_case in enumerate(test_cases):
+                if self.stopping:
+                    self.cancelled.extend(test_cases[position:])
+                    break
+                duration, profile = run_test_case(test_case, self.profiler) #tracks execution time of test
+                if profile:
+                    self.profiles[test_case.name] = profile
+                self.record_result(test_case, duration)
+        if async_cases and self.stopping:
+            self.cancelled.extend(async_cases)
+        elif async_cases:
+            asyncio.run(self.run_async_cases(async_cases, concurrency, grace_period))
+        self.actual_makespan = time.time() - run_start
+        self.results.sort_by_position()
+        if self.history:
+            self.history.save()
+        if self.cache:
+            self.cache.save()
+
+    def skip_cached(self, test_cases):
+        to_run = []
+        for test_case in test_cases:
+            if test_case.deterministic:
+                fingerprint = test_fingerprint(test_case.test_function, test_case.params)
+                if self.cache.is_cached(test_case.name, fingerprint):
+                    test_case.passed = True
+                    self.cached.append(test_case)
+                    continue
+                self.fingerprints[test_case.name] = fingerprint
+            to_run.append(test_case)
+        return to_run
+
+    def record_result(self, test_case, duration):
+        if self.keep_results:
+            self.results.append((test_case, duration), self.positions.get(id(test_case), -1))
+        if test_case.name in self.fingerprints:
+            self.cache.record(test_case.name, self.fingerprints[test_case.name], test_case.passed)
+        if self.history:
+            self.history.record(test_case.name, duration)
+        for sink in self.sinks:
+            sink.write(test_case, duration)
+        if not test_case.passed:
+            self.failures += 1
+            if self.max_failures and self.failures >= self.max_failures:
+                self.stopping = True
+
+    def run_parallel(self, workers, test_cases=None, grace_period=10.0):
+        # Yields (test_case, duration, passed, error_message) as each test case finishes
+        pending_cases = enumerate(self.test_cases if test_cases is None else test_cases)
+        local_cases = []
+        in_flight = {}
+        finished = SimpleQueue()
+        pool = Pool(processes=workers)
+
+        def fill_workers():
+            # Keeps one test case per worker in flight, so a fail-fast stop leaves nothing queued
+            while len(in_flight) < workers and not self.stopping:
+                index, test_case = next(pending_cases, (None, None))
+                if test_case is None:
+                    return
+                if is_picklable(test_case.test_function):
+                    in_flight[index] = test_case
+                    pool.apply_async(run_test_in_worker, (index, test_case, self.profiler), callback=finished.put,
+                                     error_callback=lambda error, index=index: finished.put(
+                                         (index, 0.0, False, f"Worker error: {error}", False, None)))
+                else:
+                    local_cases.append(test_case)
+
+        def collect(outcome):
+            index, duration, passed, error_message, over_budget, profile = outcome
+            test_case = in_flight.pop(index)
+            test_case.passed = passed
+            test_case.error_message = error_message
+            test_case.over_budget = over_budget
+            if profile:
+                self.profiles[test_case.name] = profile
+            return test_case, duration, passed, error_message
+
+        try:
+            fill_workers()
+            while in_flight and not self.stopping:
+                yield collect(finished.get())
+                fill_workers()
+            deadline = time.monotonic() + grace_period
+            while in_flight:
+                try:
+                    outcome = finished.get(timeout=max(deadline - time.monotonic(), 0))
+                except Empty:
+                    break
+                yield collect(outcome)
+        finally:
+            if in_flight:
+                self.cancelled.extend(in_flight.values())
+                pool.terminate()
             else:
-                print(f"✗ {test_case.name} - Failed (Duration: {duration:.4f}s) - Error: {test_case.error_message}")
+                pool.close()
+            pool.join()
+        if self.stopping:
+            self.cancelled.extend(local_cases)
+            self.cancelled.extend(test_case for index, test_case in pending_cases)
+            return
+        for position, test_case in enumerate(local_cases):
+            if self.stopping:
+                self.cancelled.extend(local_cases[position:])
+                return
+            duration, profile = run_test_case(test_case, self.profiler)
+            if profile:
+                self.profiles[test_case.name] = profile
+            yield test_case, duration, test_case.passed, test_case.error_message
+
+    async def run_async_cases(self, test_cases, concurrency, grace_period=10.0):
+        semaphore = asyncio.Semaphore(concurrency)
+        started = set()
+
+        async def run_one(test_case):
+            async with semaphore:
+                if self.stopping:
+                    self.cancelled.append(test_case)
+                    return
+                started.add(test_case)
+                start_time = time.time()
+                await test_case.run_async()
+                self.record_result(test_case, time.time() - start_time)
+
+        tasks = {asyncio.create_task(run_one(test_case)): test_case for test_case in test_cases}
+        pending = set(tasks)
+        while pending and not self.stopping:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        if pending:
+            done, pending = await asyncio.wait(pending, timeout=grace_period)
+            for task in pending:
+                task.cancel()
+                if tasks[task] in started:
+                    self.cancelled.append(tasks[task])
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    def report_results(self, results_file=None):
+        results = self.results if results_file is None else load_results(results_file)
+        print("\nTest Results:")
+        for test_case, duration in results: #test will only pass if doesn’t exceed specific benchmark
+            print(format_result(test_case, duration))
+        if self.predicted_makespan is not None and results_file is None:
+            print(f"Predicted makespan: {self.predicted_makespan:.4f}s - Actual makespan: {self.actual_makespan:.4f}s")
+        if self.cancelled and results_file is None:
+            print(f"\nStopped after {self.failures} failures, not run or cancelled:")
+            for test_case in self.cancelled:
+                print(f"- {test_case.name}")
+        if self.cached and results_file is None:
+            print("\nCached (unchanged since last pass, not run):")
+            for test_case in self.cached:
+                print(f"= {test_case.name}")
+        if self.profiles and results_file is None:
+            print("\nProfiles:")
+            for name, profile in self.profiles.items():
+                flamegraph = profile["profile_file"] or "not sampled"
+                print(f"{name} - Wall: {profile['wall_ns'] / 1e6:.3f}ms, CPU: {profile['cpu_ns'] / 1e6:.3f}ms, Stacks: {flamegraph}")
+
+
+
+def format_result(test_case, duration):
+    if test_case.passed and test_case.error_message:
+        return f"✓ {test_case.name} - Passed (Duration: {duration:.4f}s) - Note: {test_case.error_message}"
+    if test_case.passed:
+        return f"✓ {test_case.name} - Passed (Duration: {duration:.4f}s)"
+    if test_case.over_budget:
+        return f"⏱ {test_case.name} - Over Budget (Duration: {duration:.4f}s) - {test_case.error_message}"
+    return f"✗ {test_case.name} - Failed (Duration: {duration:.4f}s) - Error: {test_case.error_message}"
+
+def load_results(path):
+    # Rebuilds a ResultStore from a JSONL sink file, a truncated last line is skipped
+    results = ResultStore()
+    with open(path, encoding="utf-8") as results_file:
+        for line in results_file:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            results.add(record["name"], record["passed"], record["duration"], record["error_message"],
+                        over_budget=record.get("over_budget", False))
+    return results
+
+def test_fingerprint(test_function, params=()):
+    digest = hashlib.sha256()
+    hash_function(digest, test_function, set())
+    digest.update(repr(params).encode())
+    return digest.hexdigest()
+
+def hash_function(digest, function, seen):
+    # Hashes a function's code together with the globals and closure values it references
+    if id(function) in seen:
+        return
+    seen.add(id(function))
+    code = function.__code__
+    hash_code(digest, code)
+    for name in sorted(referenced_names(code)):
+        if name in function.__globals__:
+            digest.update(name.encode())
+            hash_value(digest, function.__globals__[name], seen)
+    for cell in function.__closure__ or ():
+        hash_value(digest, cell.cell_contents, seen)
+
+def hash_code(digest, code):
+    digest.update(code.co_code)
+    digest.update(repr(code.co_names).encode())
+    for constant in code.co_consts:
+        if inspect.iscode(constant):
+            hash_code(digest, constant)
+        else:
+            digest.update(repr(constant).encode())
 
+def referenced_names(code):
+    names = set(code.co_names)
+    for constant in code.co_consts:
+        if inspect.iscode(constant):
+            names |= referenced_names(constant)
+    return names
+
+def hash_value(digest, value, seen):
+    if inspect.isfunction(value):
+        hash_function(digest, value, seen)
+    elif inspect.ismodule(value) or inspect.isclass(value):
+        digest.update(getattr(value, "__qualname__", value.__name__).encode())
+    else:
+        digest.update(repr(value).encode())
+
+def is_picklable(test_function):
+    try:
+        pickle.dumps(test_function)
+        return True
+    except Exception:
+        return False
+
+def schedule_longest_first(test_cases, history, workers):
+    # LPT rule: take the most expensive test case next and give it to the least loaded worker
+    costs = sorted(((history.estimate(test_case.name), index, test_case) for index, test_case in enumerate(test_cases)),
+                   key=lambda cost: (-cost[0], cost[1]))
+    loads = [(0.0, worker) for worker in range(max(workers, 1))]
+    for cost, index, test_case in costs:
+        load, worker = heapq.heappop(loads)
+        heapq.heappush(loads, (load + cost, worker))
+    predicted_makespan = max(load for load, worker in loads)
+    return [test_case for cost, index, test_case in costs], predicted_makespan
+
+def parse_shard(value):
+    index, count = (int(part) for part in value.split("/"))
+    if not 1 <= index <= count:
+        raise ValueError(f"Shard {value} is not between 1/{count} and {count}/{count}")
+    return index, count
+
+def shard_of(name, count):
+    return int(hashlib.sha1(name.encode()).hexdigest(), 16) % count + 1
+
+def select_shard(test_cases, shard, history=None):
+    index, count = shard
+    if history is None:
+        return [test_case for test_case in test_cases if shard_of(test_case.name, count) == index]
+    # Ties are broken by name so every machine computes the same assignment
+    costs = sorted(test_cases, key=lambda test_case: (-history.estimate(test_case.name), test_case.name))
+    loads = [(0.0, shard_index) for shard_index in range(1, count + 1)]
+    selected = []
+    for test_case in costs:
+        load, shard_index = heapq.heappop(loads)
+        heapq.heappush(loads, (load + history.estimate(test_case.name), shard_index))
+        if shard_index == index:
+            selected.append(test_case)
+    return selected
+
+def merge_results(paths, expected_names=None):
+    merged = ResultStore()
+    order = {name: position for position, name in enumerate(expected_names or ())}
+    seen = set()
+    duplicated = []
+    for path in paths:
+        for test_case, duration in load_results(path):
+            if test_case.name in seen:
+                duplicated.append(test_case.name)
+                continue
+            seen.add(test_case.name)
+            merged.add(test_case.name, test_case.passed, duration, test_case.error_message,
+                       order.get(test_case.name, len(order)), test_case.over_budget)
+    merged.sort_by_position()
+    missing = [name for name in expected_names or () if name not in seen]
+    return merged, duplicated, missing
+
+def run_test_case(test_case, profiler=None):
+    if profiler:
+        profile = profiler.profile(test_case)
+        duration = profile["wall_ns"] / 1e9
+    else:
+        start_time = time.time()
+        test_case.run()
+        duration, profile = time.time() - start_time, None
+    if test_case.budget and test_case.passed:
+        test_case.check_budget()  # measured after the timed run, so warm-up and repeats stay out of the duration
+    return duration, profile
+
+def run_test_in_worker(index, test_case, profiler=None):
+    # Runs inside a worker process, only the outcome travels back to the runner
+    duration, profile = run_test_case(test_case, profiler)
+    return index, duration, test_case.passed, test_case.error_message, test_case.over_budget, profile
 
 
 # Sample test functions
@@ -98,22 +830,167 @@ def test_failure():
 def test_exception():
     raise ValueError("This is an intentional error.")
 
-# Create instances of TestCase
-test1 = TestCase("Test Success", test_success)
-test2 = TestCase("Test Failure", test_failure)
-test3 = TestCase("Test Exception", test_exception)
+def test_slow():
+    time.sleep(0.2)
+
+def test_cpu_heavy():
+    assert sum(number * number for number in range(2_000_000)) > 0
+
+def test_in_range(value, low, high):
+    assert low <= value <= high
+
+def test_sort_hot_path():
+    assert sorted(range(20_000, 0, -1))[0] == 1
+
+async def test_api_wait():
+    await asyncio.sleep(0.2)
+    assert 1 + 1 == 2
+
+def sample_suite():
+    test_cases = [TestCase("Test Success", test_success),
+                  TestCase("Test Failure", test_failure),
+                  TestCase("Test Exception", test_exception),
+                  TestCase("Test Slow", test_slow)]
+    for value in range(12):
+        test_cases.append(TestCase(f"Test In Range {value}", test_in_range, params=(value, 0, 10)))
+    return test_cases
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Run the sample suite on one shard or merge the shard results.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_command = commands.add_parser("run")
+    run_command.add_argument("--shard", type=parse_shard, help="i/n, run the i-th of n shards")
+    run_command.add_argument("--shard-by", choices=("hash", "duration"), default="hash")
+    run_command.add_argument("--history-file")
+    run_command.add_argument("--workers", type=int, default=1)
+    run_command.add_argument("--results", default="results.jsonl")
+    merge_command = commands.add_parser("merge")
+    merge_command.add_argument("results_files", nargs="+")
+    arguments = parser.parse_args(argv)
+
+    if arguments.command == "run":
+        if arguments.shard_by == "duration" and not arguments.history_file:
+            parser.error("--shard-by duration needs --history-file")
+        with TestRunner(history_file=arguments.history_file, sinks=[JsonlResultSink(arguments.results)]) as runner:
+            for test_case in sample_suite():
+                runner.add_test_case(test_case)
+            runner.run_tests(workers=arguments.workers, shard=arguments.shard, shard_by=arguments.shard_by)
+        runner.report_results()
+        return 0
+
+    merged, duplicated, missing = merge_results(arguments.results_files,
+                                                [test_case.name for test_case in sample_suite()])
+    runner = TestRunner()
+    runner.results = merged
+    runner.report_results()
+    for name in duplicated:
+        print(f"Duplicated: {name}")
+    for name in missing:
+        print(f"Missing: {name}")
+    return 1 if duplicated or missing else 0
+
+if __name__ == "__main__" and len(sys.argv) > 1:
+    sys.exit(main(sys.argv[1:]))
+
+if __name__ == "__main__":
+    # Create instances of TestCase
+    test1 = TestCase("Test Success", test_success)
+    test2 = TestCase("Test Failure", test_failure)
+    test3 = TestCase("Test Exception", test_exception)
+
+
+    # Instantiate the test runner
+    runner = TestRunner()
+
+    # Add test cases to the runner
+    runner.add_test_case(test1)
+    runner.add_test_case(test2)
+    runner.add_test_case(test3)
+
+    # Run the tests
+    runner.run_tests()
+
+    # Report the results
+    runner.report_results()
+
+    # Run the same test cases on a pool of 4 worker processes
+    parallel_runner = TestRunner()
+    for test_case in (TestCase("Test Success", test_success),
+                      TestCase("Test Failure", test_failure),
+                      TestCase("Test Exception", test_exception),
+                      TestCase("Test Lambda", lambda: None)):  # not picklable, runs in the main process
+        parallel_runner.add_test_case(test_case)
+    parallel_runner.run_tests(workers=4)
+    parallel_runner.report_results()
+
+    # Schedule longest-first using the durations saved by previous runs
+    scheduled_runner = TestRunner(history_file="test_durations.json")
+    for test_case in (TestCase("Test Success", test_success),
+                      TestCase("Test Slow", test_slow),
+                      TestCase("Test Failure", test_failure)):
+        scheduled_runner.add_test_case(test_case)
+    scheduled_runner.run_tests(workers=2)
+    scheduled_runner.report_results()
+
+    # Five async checks waiting 0.2s each finish in about 0.2s on one event loop
+    async_runner = TestRunner()
+    for number in range(5):
+        async_runner.add_test_case(TestCase(f"Test API Wait {number}", test_api_wait))
+    async_start = time.time()
+    async_runner.run_tests(concurrency=5)
+    async_runner.report_results()
+    print(f"Async suite wall time: {time.time() - async_start:.4f}s")
+
+    # Stream every result to JSONL, JUnit XML and the console without keeping them in memory
+    with TestRunner(sinks=[JsonlResultSink("results.jsonl"), JUnitXmlResultSink("results.xml"),
+                           ConsoleResultSink()], keep_results=False) as streaming_runner:
+        for test_case in (TestCase("Test Success", test_success),
+                          TestCase("Test Failure", test_failure),
+                          TestCase("Test Exception", test_exception)):
+            streaming_runner.add_test_case(test_case)
+        streaming_runner.run_tests()
+    streaming_runner.report_results(results_file="results.jsonl")
 
+    # Profile each test, tests running longer than 50ms also get a collapsed-stack file
+    profiled_runner = TestRunner(profiler=TestProfiler(output_dir="profiles", threshold=0.05))
+    for test_case in (TestCase("Test Success", test_success),
+                      TestCase("Test CPU Heavy", test_cpu_heavy)):
+        profiled_runner.add_test_case(test_case)
+    profiled_runner.run_tests()
+    profiled_runner.report_results()
 
-# Instantiate the test runner
-runner = TestRunner()
+    # Deterministic data-driven checks are skipped on the second run while their code and inputs are unchanged
+    for run in range(2):
+        cached_runner = TestRunner(cache_file="test_cache.json")
+        for value in (1, 5, 12):
+            cached_runner.add_test_case(TestCase(f"Test In Range {value}", test_in_range,
+                                                 params=(value, 0, 10), deterministic=True))
+        cached_runner.run_tests()
+        cached_runner.report_results()
 
-# Add test cases to the runner
-runner.add_test_case(test1)
-runner.add_test_case(test2)
-runner.add_test_case(test3)
+    # Gate a hot path on its median latency, a generous and a tight budget
+    budget_runner = TestRunner()
+    budget_runner.add_test_case(TestCase("Test Sort Within Budget", test_sort_hot_path,
+                                         budget=PerformanceBudget(max_seconds=0.5)))
+    budget_runner.add_test_case(TestCase("Test Sort Over Budget", test_sort_hot_path,
+                                         budget=PerformanceBudget(max_seconds=0.000001, statistic="p95")))
+    budget_runner.run_tests()
+    budget_runner.report_results()
 
-# Run the tests
-runner.run_tests()
+    # Stop the suite after the first failure instead of running every remaining test case
+    fail_fast_runner = TestRunner()
+    for test_case in (TestCase("Test Smoke", test_failure),
+                      TestCase("Test Slow 1", test_slow),
+                      TestCase("Test Slow 2", test_slow),
+                      TestCase("Test Slow 3", test_slow)):
+        fail_fast_runner.add_test_case(test_case)
+    fail_fast_runner.run_tests(workers=2, max_failures=1, grace_period=1.0)
+    fail_fast_runner.report_results()
 
-# Report the results
-runner.report_results()
+    # A large data-driven run, the results take a few bytes each plus the interned names
+    bulk_runner = TestRunner()
+    for row in range(100_000):
+        bulk_runner.add_test_case(TestCase(f"Row {row}", test_in_range, params=(row % 12, 0, 10)))
+    bulk_runner.run_tests()
+    failures = sum(1 for test_case, duration in bulk_runner.results if not test_case.passed)
+    print(f"\nBulk run: {len(bulk_runner.results)} results, {failures} failures")